@@ -6,11 +6,23 @@ import os
 import logging
 import json
 import re
+import hashlib
 from typing import List, Dict, Optional
 import google.generativeai as genai
 
+# Optional import - suggestion cache is used only when REDIS_URL is configured
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
 logger = logging.getLogger(__name__)
 
+# Cached suggestions per normalized title (titles repeat heavily across sellers)
+SUGGESTION_CACHE_TTL = 86400
+_TITLE_PUNCT_RE = re.compile(r'[^\w\s]')
+
 
 class CategoryAnalyzer:
     """
@@ -35,6 +47,15 @@ class CategoryAnalyzer:
             'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
         }
 
+        # Suggestion cache (shared across gunicorn workers)
+        self.cache = None
+        redis_url = os.getenv('REDIS_URL')
+        if redis_url:
+            if HAS_REDIS:
+                self.cache = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+            else:
+                logger.warning("⚠️ REDIS_URL is set but redis is not installed, category suggestion cache disabled")
+
         logger.info("✅ CategoryAnalyzer initialized with Gemini 2.0 Flash")
 
     def flatten_categories(self, categories: List[Dict], parent_path: str = "") -> List[Dict]:
@@ -84,6 +105,7 @@ class CategoryAnalyzer:
     ) -> List[Dict]:
         """
         Suggest appropriate Naver categories for a product using AI
+        Results are cached in Redis per normalized title when REDIS_URL is set
 
         Args:
             product_data: {
@@ -107,6 +129,56 @@ class CategoryAnalyzer:
                 ...
             ]
         """
+        cache_key = self._suggestion_cache_key(product_data.get('title', ''), top_k)
+        cached = self._get_cached_suggestions(cache_key)
+        if cached is not None:
+            logger.info("⚡ Category suggestion cache hit")
+            return cached
+
+        suggestions = self._suggest_categories_uncached(product_data, categories_tree, top_k)
+
+        # Empty results mean the analysis failed - don't cache them
+        if suggestions:
+            self._set_cached_suggestions(cache_key, suggestions)
+
+        return suggestions
+
+    def _suggestion_cache_key(self, title: str, top_k: int) -> str:
+        """Cache key from the normalized title (lowercase, no punctuation, sorted tokens)"""
+        tokens = sorted(_TITLE_PUNCT_RE.sub(' ', title.lower()).split())
+        digest = hashlib.blake2b(' '.join(tokens).encode('utf-8'), digest_size=16).hexdigest()
+        return f"sug:{top_k}:{digest}"
+
+    def _get_cached_suggestions(self, cache_key: str) -> Optional[List[Dict]]:
+        """Get cached suggestions (None on miss or cache error)"""
+        if self.cache is None:
+            return None
+
+        try:
+            raw = self.cache.get(cache_key)
+        except Exception as e:
+            logger.warning(f"⚠️ Category suggestion cache get failed: {str(e)}")
+            return None
+
+        return json.loads(raw) if raw is not None else None
+
+    def _set_cached_suggestions(self, cache_key: str, suggestions: List[Dict]):
+        """Cache suggestions for SUGGESTION_CACHE_TTL"""
+        if self.cache is None:
+            return
+
+        try:
+            self.cache.setex(cache_key, SUGGESTION_CACHE_TTL, json.dumps(suggestions, ensure_ascii=False))
+        except Exception as e:
+            logger.warning(f"⚠️ Category suggestion cache set failed: {str(e)}")
+
+    def _suggest_categories_uncached(
+        self,
+        product_data: Dict,
+        categories_tree: List[Dict],
+        top_k: int
+    ) -> List[Dict]:
+        """Run the Gemini category analysis (see suggest_categories)"""
         try:
             # Flatten categories to leaf nodes only
             leaf_categories = self.flatten_categories(categories_tree)
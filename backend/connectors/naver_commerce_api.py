@@ -4,16 +4,45 @@ Handles SmartStore product registration and management
 """
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 import time
 import hashlib
 import hmac
 import base64
-from typing import Dict, List, Optional, Any
+import json
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive connection pool shared by all clients and worker threads
+# (Naver API calls + image downloads); retries connection failures only -
+# image uploads keep their own 502 retry loop
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=Retry(total=3, backoff_factor=0.3))
+_session.mount('https://', _adapter)
+_session.mount('http://', _adapter)
+
+# Max imageFiles per Naver product-images/upload request
+IMAGE_UPLOAD_BATCH_SIZE = 10
+
+# Pre-downloaded category list (static data, see get_categories)
+CATEGORIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'naver_categories.json')
+
+
+@lru_cache(maxsize=1)
+def _load_categories_file(categories_file: str) -> List[Dict]:
+    """Parse the category JSON once per process (shared, treat as read-only)"""
+    with open(categories_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    categories = data.get('categories', [])
+    logger.info(f"✅ Loaded {len(categories)} categories from local file")
+    return categories
+
 
 class NaverCommerceAPI:
     """Naver Commerce API Client for SmartStore integration"""
@@ -83,7 +112,7 @@ class NaverCommerceAPI:
             else:
                 logger.info("🔐 Requesting OAuth token without client_secret (using client_id only)")
 
-            response = requests.post(self.TOKEN_URL, data=data, timeout=30)
+            response = _session.post(self.TOKEN_URL, data=data, timeout=30)
             response.raise_for_status()
 
             result = response.json()
@@ -152,13 +181,13 @@ class NaverCommerceAPI:
 
         try:
             if method == 'GET':
-                response = requests.get(url, headers=headers, params=params)
+                response = _session.get(url, headers=headers, params=params)
             elif method == 'POST':
-                response = requests.post(url, headers=headers, json=data)
+                response = _session.post(url, headers=headers, json=data)
             elif method == 'PUT':
-                response = requests.put(url, headers=headers, json=data)
+                response = _session.put(url, headers=headers, json=data)
             elif method == 'DELETE':
-                response = requests.delete(url, headers=headers)
+                response = _session.delete(url, headers=headers)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
 
@@ -171,92 +200,94 @@ class NaverCommerceAPI:
                 logger.error(f"Response: {e.response.text}")
             raise
 
-    def upload_image(self, image_url: str, max_retries: int = 3) -> Optional[str]:
+    def _prepare_image_file(self, image_url: str) -> Tuple[str, bytes]:
         """
-        Upload image to Naver and get image ID
-        Converts WebP to JPEG, resizes to 1000px width for consistency
+        Download an image and convert it for Naver upload
+        Converts WebP/PNG to JPEG, resizes to 1000px width for consistency
+
+        Returns:
+            (filename, JPEG bytes)
+        """
+        from PIL import Image
+        from io import BytesIO
+
+        # Fix URL if scheme is missing
+        if not image_url.startswith(('http://', 'https://')):
+            image_url = f'https://{image_url}'
+            logger.info(f"🔧 Fixed image URL (added https://): {image_url}")
+
+        # Download image
+        img_response = _session.get(image_url, timeout=30)
+        img_response.raise_for_status()
+
+        # Check file type
+        filename = image_url.split('/')[-1].split('?')[0]
+        is_webp = filename.endswith('.webp') or img_response.headers.get('Content-Type') == 'image/webp'
+        is_png = filename.endswith('.png') or img_response.headers.get('Content-Type') == 'image/png'
+
+        # Always process image for consistency
+        image = Image.open(BytesIO(img_response.content))
+
+        # Convert RGBA to RGB if needed (PNG often has RGBA)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            logger.info(f"🔄 Converting {image.mode} to RGB for JPEG compatibility...")
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            if image.mode == 'P':
+                image = image.convert('RGBA')
+            background.paste(image, mask=image.split()[-1] if image.mode in ('RGBA', 'LA') else None)
+            image = background
+
+        # Resize ALL images to consistent width (1000px) while maintaining aspect ratio
+        target_width = 1000
+        if image.width != target_width:
+            ratio = target_width / image.width
+            new_height = int(image.height * ratio)
+            image = image.resize((target_width, new_height), Image.Resampling.LANCZOS)
+            action = "Resized" if image.width > target_width else "Upscaled"
+            logger.info(f"📐 {action} image to {target_width}x{new_height}px")
+
+        # Save as JPEG (always)
+        output = BytesIO()
+        image.save(output, format='JPEG', quality=95)
+
+        # Update filename to .jpg
+        if is_webp:
+            filename = filename.replace('.webp', '.jpg')
+            logger.info(f"✅ Converted WebP to JPEG: {filename}")
+        elif is_png:
+            filename = filename.replace('.png', '.jpg')
+            logger.info(f"✅ Converted PNG to JPEG: {filename}")
+        elif not any(filename.endswith(ext) for ext in ['.jpg', '.jpeg']):
+            filename = 'image.jpg'
+
+        return filename, output.getvalue()
+
+    def _post_image_files(self, image_files: List[Tuple[str, bytes]], max_retries: int = 3) -> List[Optional[str]]:
+        """
+        Upload prepared images to Naver in one multipart request
         Retries on 502 errors
 
         Args:
-            image_url: URL of image to upload
+            image_files: (filename, JPEG bytes) pairs, at most IMAGE_UPLOAD_BATCH_SIZE
             max_retries: Maximum retry attempts for 502 errors
 
         Returns:
-            Naver image ID or None if failed
+            Naver image URLs in input order (None where the upload failed)
         """
-        import time
+        # Upload to Naver - Use correct endpoint
+        endpoint = '/external/v1/product-images/upload'
+        url = f"{self.BASE_URL}{endpoint}"
+        files = [('imageFiles', (filename, content, 'image/jpeg')) for filename, content in image_files]
 
         for attempt in range(max_retries):
             try:
-                from PIL import Image
-                from io import BytesIO
-
-                # Fix URL if scheme is missing
-                if not image_url.startswith(('http://', 'https://')):
-                    image_url = f'https://{image_url}'
-                    logger.info(f"🔧 Fixed image URL (added https://): {image_url}")
-
-                # Download image
-                img_response = requests.get(image_url, timeout=30)
-                img_response.raise_for_status()
-
-                # Upload to Naver - Use correct endpoint
-                endpoint = '/external/v1/product-images/upload'
-
-                # Check file type
-                filename = image_url.split('/')[-1].split('?')[0]
-                is_webp = filename.endswith('.webp') or img_response.headers.get('Content-Type') == 'image/webp'
-                is_png = filename.endswith('.png') or img_response.headers.get('Content-Type') == 'image/png'
-
-                # Always process image for consistency
-                image = Image.open(BytesIO(img_response.content))
-
-                # Convert RGBA to RGB if needed (PNG often has RGBA)
-                if image.mode in ('RGBA', 'LA', 'P'):
-                    logger.info(f"🔄 Converting {image.mode} to RGB for JPEG compatibility...")
-                    background = Image.new('RGB', image.size, (255, 255, 255))
-                    if image.mode == 'P':
-                        image = image.convert('RGBA')
-                    background.paste(image, mask=image.split()[-1] if image.mode in ('RGBA', 'LA') else None)
-                    image = background
-
-                # Resize ALL images to consistent width (1000px) while maintaining aspect ratio
-                target_width = 1000
-                if image.width != target_width:
-                    ratio = target_width / image.width
-                    new_height = int(image.height * ratio)
-                    image = image.resize((target_width, new_height), Image.Resampling.LANCZOS)
-                    action = "Resized" if image.width > target_width else "Upscaled"
-                    logger.info(f"📐 {action} image to {target_width}x{new_height}px")
-
-                # Save as JPEG (always)
-                output = BytesIO()
-                image.save(output, format='JPEG', quality=95)
-                image_content = output.getvalue()
-                content_type = 'image/jpeg'
-
-                # Update filename to .jpg
-                if is_webp:
-                    filename = filename.replace('.webp', '.jpg')
-                    logger.info(f"✅ Converted WebP to JPEG: {filename}")
-                elif is_png:
-                    filename = filename.replace('.png', '.jpg')
-                    logger.info(f"✅ Converted PNG to JPEG: {filename}")
-                elif not any(filename.endswith(ext) for ext in ['.jpg', '.jpeg']):
-                    filename = 'image.jpg'
-
-                files = {'imageFiles': (filename, image_content, content_type)}
-
-                url = f"{self.BASE_URL}{endpoint}"
-
                 # Get valid OAuth 2.0 access token
                 access_token = self._get_access_token()
-
                 headers = {
                     'Authorization': f'Bearer {access_token}'
                 }
 
-                response = requests.post(url, headers=headers, files=files, timeout=30)
+                response = _session.post(url, headers=headers, files=files, timeout=30)
 
                 # Log response for debugging
                 logger.info(f"🔍 Upload response status: {response.status_code}")
@@ -266,18 +297,17 @@ class NaverCommerceAPI:
 
                 result = response.json()
 
-                # Extract image URL from Naver response
+                # Extract image URLs from Naver response (one entry per uploaded file, in order)
                 # Format: {"images":[{"url":"https://shop-phinf.pstatic.net/..."}]}
-                image_url_result = None
-                if 'images' in result and len(result['images']) > 0:
-                    image_url_result = result['images'][0].get('url')
+                image_urls = [image.get('url') for image in result.get('images') or []]
 
                 # Fallback to other possible fields
-                if not image_url_result:
-                    image_url_result = result.get('imageId') or result.get('id') or result.get('url')
+                if len(image_files) == 1 and not (image_urls and image_urls[0]):
+                    image_urls = [result.get('imageId') or result.get('id') or result.get('url')]
 
-                logger.info(f"✅ Image uploaded successfully: {image_url_result}")
-                return image_url_result
+                image_urls = (image_urls + [None] * len(image_files))[:len(image_files)]
+                logger.info(f"✅ Uploaded {sum(1 for u in image_urls if u)}/{len(image_files)} images")
+                return image_urls
 
             except requests.exceptions.HTTPError as e:
                 # Retry on 502 Bad Gateway errors
@@ -288,13 +318,72 @@ class NaverCommerceAPI:
                     continue
 
                 logger.error(f"❌ Failed to upload image (HTTP {e.response.status_code}): {e.response.text[:500]}")
-                return None
+                return [None] * len(image_files)
             except Exception as e:
                 logger.error(f"❌ Failed to upload image: {str(e)}")
-                return None
+                return [None] * len(image_files)
 
         logger.error(f"❌ Failed to upload image after {max_retries} attempts")
-        return None
+        return [None] * len(image_files)
+
+    def upload_image(self, image_url: str, max_retries: int = 3) -> Optional[str]:
+        """
+        Upload image to Naver and get image ID
+        Converts WebP to JPEG, resizes to 1000px width for consistency
+        Retries on 502 errors
+
+        Args:
+            image_url: URL of image to upload
+            max_retries: Maximum retry attempts for 502 errors
+
+        Returns:
+            Naver image ID or None if failed
+        """
+        try:
+            image_file = self._prepare_image_file(image_url)
+        except Exception as e:
+            logger.error(f"❌ Failed to upload image: {str(e)}")
+            return None
+
+        return self._post_image_files([image_file], max_retries)[0]
+
+    def upload_images_batch(self, image_urls: List[str], executor=None, max_retries: int = 3) -> List[Optional[str]]:
+        """
+        Upload several images with one Naver request per IMAGE_UPLOAD_BATCH_SIZE images
+        Downloads/conversions run on executor when given (e.g. a ThreadPoolExecutor)
+
+        Args:
+            image_urls: URLs of images to upload
+            executor: Optional executor for concurrent downloads
+            max_retries: Maximum retry attempts for 502 errors
+
+        Returns:
+            Naver image URLs in input order (None where the upload failed)
+        """
+        def prepare(image_url):
+            try:
+                return self._prepare_image_file(image_url)
+            except Exception as e:
+                logger.error(f"❌ Failed to download image {image_url}: {str(e)}")
+                return None
+
+        prepared = list(executor.map(prepare, image_urls)) if executor else [prepare(u) for u in image_urls]
+        ready = [(index, image_file) for index, image_file in enumerate(prepared) if image_file]
+
+        uploaded = [None] * len(image_urls)
+        for start in range(0, len(ready), IMAGE_UPLOAD_BATCH_SIZE):
+            batch = ready[start:start + IMAGE_UPLOAD_BATCH_SIZE]
+            batch_urls = self._post_image_files([image_file for _, image_file in batch], max_retries)
+
+            # One bad file fails the whole request - retry the batch one image at a time
+            if len(batch) > 1 and not any(batch_urls):
+                logger.warning(f"⚠️ Batch image upload failed, retrying {len(batch)} images individually")
+                batch_urls = [self._post_image_files([image_file], max_retries)[0] for _, image_file in batch]
+
+            for (index, _), image_url in zip(batch, batch_urls):
+                uploaded[index] = image_url
+
+        return uploaded
 
     def get_categories(self) -> Dict:
         """
@@ -302,6 +391,7 @@ class NaverCommerceAPI:
 
         Note: Naver Commerce API doesn't provide /external/v2/categories endpoint (404).
         Instead, we use a pre-downloaded category list stored in data/naver_categories.json
+        (parsed once per process; the returned list is shared and must not be mutated)
 
         Returns:
             {
@@ -311,12 +401,7 @@ class NaverCommerceAPI:
             }
         """
         try:
-            logger.info("📋 Loading SmartStore category list from local file...")
-
-            # Get path to categories JSON file
-            import os
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            categories_file = os.path.join(current_dir, '..', 'data', 'naver_categories.json')
+            categories_file = CATEGORIES_FILE
 
             # Check if file exists
             if not os.path.exists(categories_file):
@@ -326,13 +411,8 @@ class NaverCommerceAPI:
                     'error': f'Categories file not found: {categories_file}'
                 }
 
-            # Read JSON file
-            import json
-            with open(categories_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            categories = data.get('categories', [])
-            logger.info(f"✅ Loaded {len(categories)} categories from local file")
+            # Parsed once per process, reused by every call
+            categories = _load_categories_file(categories_file)
 
             return {
                 'success': True,
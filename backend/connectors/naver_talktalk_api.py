@@ -4,19 +4,75 @@ Send customer messages and handle responses for customs clearance ID requests
 """
 import os
 import re
+import time
 import logging
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, Optional
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Korean customs ID format: P + 12 digits (total 13 characters)
+_CUSTOMS_ID_RE = re.compile(r'P\d{12}')
+_CLEAN_RE = re.compile(r'[\s\-]')
+
+# Retry transient TalkTalk API failures (idempotent methods only - POST is
+# never retried so a message can't be delivered twice)
+_TALKTALK_RETRY = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=(429, 500, 502, 503, 504)
+)
+
+# Circuit breaker: after N consecutive failures, fail fast for a cooldown
+# instead of tying up sync worker threads on request timeouts
+TALKTALK_BREAKER_THRESHOLD = 5
+TALKTALK_BREAKER_COOLDOWN_SECONDS = 60
+
+
+class TalkTalkCircuitOpenError(Exception):
+    """Raised without a network call while the TalkTalk circuit breaker is open"""
+    pass
+
+# Customs ID request message (parsed once, filled per order with format_map)
+_CUSTOMS_MSG_TEMPLATE = """안녕하세요 {buyer_name}님,
+
+주문하신 상품 [{product_name}]의 통관을 위해 **개인통관고유부호**가 필요합니다.
+
+📦 주문번호: {order_id}
+
+아래 링크에서 개인통관고유부호를 확인하실 수 있습니다:
+https://unipass.customs.go.kr/csp/index.do
+
+개인통관고유부호를 이 메시지에 답장으로 보내주시면 빠르게 처리하겠습니다.
+
+예) P123456789012
+
+감사합니다! 😊"""
+
+# Optional: Quick reply buttons (shared, read-only)
+_CUSTOMS_MSG_BUTTONS = (
+    {
+        "type": "TEXT",
+        "title": "번호 확인하기",
+        "value": "https://unipass.customs.go.kr/csp/index.do"
+    },
+)
+
 
 class NaverTalkTalkAPI:
     """Naver TalkTalk API Client for customer messaging"""
 
     BASE_URL = "https://talk.naver.com/api"
 
+    # Circuit breaker state (shared by all instances and sender threads)
+    _cb_failures = 0
+    _cb_open_until = 0.0
+    _cb_lock = threading.Lock()
+
     def __init__(self, partner_id: str = None, authorization: str = None):
         """
         Initialize TalkTalk API client
@@ -31,6 +87,19 @@ class NaverTalkTalkAPI:
         if not self.partner_id or not self.authorization:
             raise ValueError("TalkTalk Partner ID and Authorization are required")
 
+        # Keep-alive connection pool shared by all requests from this client
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=_TALKTALK_RETRY)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Authorization': self.authorization,
+            'Content-Type': 'application/json'
+        })
+
+    def close(self):
+        """Close pooled HTTP connections"""
+        self.session.close()
+
     def _make_request(self, method: str, endpoint: str, data: Dict = None) -> Dict:
         """
         Make HTTP request to TalkTalk API
@@ -42,36 +111,65 @@ class NaverTalkTalkAPI:
 
         Returns:
             API response as dictionary
+
+        Raises:
+            TalkTalkCircuitOpenError: While the circuit breaker is open (no request is made)
         """
         url = f"{self.BASE_URL}{endpoint}"
-        headers = {
-            'Authorization': self.authorization,
-            'Content-Type': 'application/json'
-        }
+
+        # Circuit open: fail fast without touching the network
+        if time.monotonic() < NaverTalkTalkAPI._cb_open_until:
+            raise TalkTalkCircuitOpenError("TalkTalk API circuit breaker is open")
 
         try:
             logger.info(f"TalkTalk API Request: {method} {url}")
 
             if method == 'GET':
-                response = requests.get(url, headers=headers, timeout=30)
+                response = self.session.get(url, timeout=30)
             elif method == 'POST':
-                response = requests.post(url, headers=headers, json=data, timeout=30)
+                response = self.session.post(url, json=data, timeout=30)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
 
             response.raise_for_status()
-            return response.json()
+            result = response.json()
+            self._record_success()
+            return result
 
         except requests.exceptions.Timeout:
             logger.error(f"TalkTalk API timeout: {endpoint}")
+            self._record_failure()
             raise Exception("TalkTalk API request timeout")
         except requests.exceptions.HTTPError as e:
             logger.error(f"TalkTalk API HTTP error: {e.response.text}")
+            # Client errors (bad user, bad payload) say nothing about API health
+            if e.response.status_code == 429 or e.response.status_code >= 500:
+                self._record_failure()
             raise Exception(f"TalkTalk API error: {e.response.status_code}")
         except Exception as e:
             logger.error(f"TalkTalk API request failed: {str(e)}")
+            self._record_failure()
             raise
 
+    @classmethod
+    def _record_success(cls):
+        """Close circuit"""
+        with cls._cb_lock:
+            cls._cb_failures = 0
+            cls._cb_open_until = 0.0
+
+    @classmethod
+    def _record_failure(cls):
+        """Count a consecutive failure, opening the circuit at the threshold"""
+        with cls._cb_lock:
+            cls._cb_failures += 1
+            if cls._cb_failures >= TALKTALK_BREAKER_THRESHOLD:
+                cls._cb_open_until = time.monotonic() + TALKTALK_BREAKER_COOLDOWN_SECONDS
+                logger.warning(
+                    f"⚠️ TalkTalk API failed {cls._cb_failures} times in a row, "
+                    f"failing fast for {TALKTALK_BREAKER_COOLDOWN_SECONDS}s"
+                )
+
     def send_message(
         self,
         user_id: str,
@@ -122,6 +220,14 @@ class NaverTalkTalkAPI:
                 'sent_at': datetime.now().isoformat()
             }
 
+        except TalkTalkCircuitOpenError as e:
+            # Not attempted - callers can leave the message queued for a later retry
+            logger.warning(f"⚠️ TalkTalk message to {user_id} not sent: {str(e)}")
+            return {
+                'success': False,
+                'circuit_open': True,
+                'error': str(e)
+            }
         except Exception as e:
             logger.error(f"❌ Failed to send TalkTalk message: {str(e)}")
             return {
@@ -148,35 +254,17 @@ class NaverTalkTalkAPI:
         Returns:
             Response with message_id and status
         """
-        # Build message template
-        message = f"""안녕하세요 {buyer_name}님,
-
-주문하신 상품 [{product_name}]의 통관을 위해 **개인통관고유부호**가 필요합니다.
-
-📦 주문번호: {order_id}
-
-아래 링크에서 개인통관고유부호를 확인하실 수 있습니다:
-https://unipass.customs.go.kr/csp/index.do
-
-개인통관고유부호를 이 메시지에 답장으로 보내주시면 빠르게 처리하겠습니다.
-
-예) P123456789012
-
-감사합니다! 😊"""
-
-        # Optional: Add quick reply buttons
-        buttons = [
-            {
-                "type": "TEXT",
-                "title": "번호 확인하기",
-                "value": "https://unipass.customs.go.kr/csp/index.do"
-            }
-        ]
+        # Fill message template
+        message = _CUSTOMS_MSG_TEMPLATE.format_map({
+            'buyer_name': buyer_name,
+            'product_name': product_name,
+            'order_id': order_id
+        })
 
         return self.send_message(
             user_id=buyer_phone,
             message=message,
-            buttons=buttons
+            buttons=_CUSTOMS_MSG_BUTTONS
         )
 
     def parse_customs_id(self, customer_message: str) -> Optional[str]:
@@ -193,11 +281,10 @@ https://unipass.customs.go.kr/csp/index.do
         # Example: P123456789012
 
         # Remove whitespace and special characters
-        cleaned = re.sub(r'[\s\-]', '', customer_message.upper())
+        cleaned = _CLEAN_RE.sub('', customer_message.upper())
 
         # Pattern: P followed by 12 digits
-        pattern = r'P\d{12}'
-        match = re.search(pattern, cleaned)
+        match = _CUSTOMS_ID_RE.search(cleaned)
 
         if match:
             customs_id = match.group(0)
@@ -220,16 +307,5 @@ https://unipass.customs.go.kr/csp/index.do
         if not customs_id:
             return False
 
-        # Must be exactly 13 characters (P + 12 digits)
-        if len(customs_id) != 13:
-            return False
-
-        # Must start with 'P'
-        if not customs_id.startswith('P'):
-            return False
-
-        # Following 12 characters must be digits
-        if not customs_id[1:].isdigit():
-            return False
-
-        return True
+        # Exactly 13 characters: 'P' followed by 12 digits
+        return _CUSTOMS_ID_RE.fullmatch(customs_id) is not None
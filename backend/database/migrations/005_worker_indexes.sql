@@ -0,0 +1,15 @@
+-- Migration: Indexes for background worker polling
+-- Description: Partial index for orders the purchase/retry workers pick up,
+-- composite index for the SmartStore sync worker's status scans
+
+-- Orders waiting on a worker (supplier ordering, retries, manual review queue)
+CREATE INDEX IF NOT EXISTS idx_orders_status_worker ON orders(status)
+  WHERE status IN ('SUPPLIER_ORDERING', 'RETRYING', 'MANUAL_REVIEW');
+
+-- SmartStore orders by order/TalkTalk status (customs ID follow-ups)
+CREATE INDEX IF NOT EXISTS idx_smartstore_orders_order_status_talktalk
+  ON smartstore_orders(order_status, talktalk_status);
+
+-- Comments
+COMMENT ON INDEX idx_orders_status_worker IS 'Partial index for purchase/retry worker polling';
+COMMENT ON INDEX idx_smartstore_orders_order_status_talktalk IS 'SmartStore sync worker status scans';
@@ -223,6 +223,94 @@ COMMENT ON COLUMN product_candidates.discovery_keyword IS 'Keyword that led to p
 COMMENT ON COLUMN product_candidates.suggested_price IS 'Suggested selling price (KRW)';
 COMMENT ON COLUMN product_candidates.suggested_margin IS 'Expected margin (KRW)';
 
+-- =============================================================================
+-- Migration 005: Worker Indexes
+-- =============================================================================
+
+-- Migration: Indexes for background worker polling
+-- Description: Partial index for orders the purchase/retry workers pick up,
+-- composite index for the SmartStore sync worker's status scans
+
+-- Orders waiting on a worker (supplier ordering, retries, manual review queue)
+CREATE INDEX IF NOT EXISTS idx_orders_status_worker ON orders(status)
+  WHERE status IN ('SUPPLIER_ORDERING', 'RETRYING', 'MANUAL_REVIEW');
+
+-- SmartStore orders by order/TalkTalk status (customs ID follow-ups)
+CREATE INDEX IF NOT EXISTS idx_smartstore_orders_order_status_talktalk
+  ON smartstore_orders(order_status, talktalk_status);
+
+-- Comments
+COMMENT ON INDEX idx_orders_status_worker IS 'Partial index for purchase/retry worker polling';
+COMMENT ON INDEX idx_smartstore_orders_order_status_talktalk IS 'SmartStore sync worker status scans';
+
+-- =============================================================================
+-- Migration 006: Dead Letter Orders
+-- =============================================================================
+
+-- Migration: Dead-letter queue for purchase jobs
+-- Description: Orders whose purchase job exhausted its retries, kept for manual review
+
+CREATE TABLE IF NOT EXISTS dead_letter_orders (
+  id BIGSERIAL PRIMARY KEY,
+  order_id UUID NOT NULL REFERENCES orders(id) ON DELETE CASCADE,
+  job_type TEXT NOT NULL,                         -- 'purchase', 'forwarder'
+  job_id TEXT,
+  attempts INTEGER NOT NULL,
+  reason TEXT,
+  meta JSONB DEFAULT '{}'::JSONB,
+  resolved_at TIMESTAMPTZ,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE (order_id, job_type)
+);
+
+-- Unresolved entries (manual review queue)
+CREATE INDEX IF NOT EXISTS idx_dead_letter_orders_unresolved ON dead_letter_orders(created_at DESC)
+  WHERE resolved_at IS NULL;
+
+-- Comments
+COMMENT ON TABLE dead_letter_orders IS 'Orders whose background job exhausted its retries';
+COMMENT ON COLUMN dead_letter_orders.resolved_at IS 'Set when an operator has handled the order';
+
+-- =============================================================================
+-- Migration 007: TalkTalk Lookup Indexes
+-- =============================================================================
+
+-- Migration: Indexes for TalkTalk customs ID lookups
+-- Description: Partial composite index for the TalkTalk webhook's pending-order lookup,
+-- composite index for the SmartStore orders list filtered by TalkTalk status
+-- (Created without CONCURRENTLY here so the whole script can run in one transaction)
+
+-- Latest SENT order still waiting on a customs ID for a buyer (TalkTalk webhook)
+CREATE INDEX IF NOT EXISTS idx_smartstore_orders_talktalk_lookup
+  ON smartstore_orders(buyer_phone, talktalk_status, created_at DESC)
+  WHERE customs_id IS NULL;
+
+-- SmartStore orders list filtered by TalkTalk status, newest first
+CREATE INDEX IF NOT EXISTS idx_smartstore_orders_talktalk_created
+  ON smartstore_orders(talktalk_status, created_at DESC);
+
+-- Comments
+COMMENT ON INDEX idx_smartstore_orders_talktalk_lookup IS 'TalkTalk webhook pending customs ID lookup';
+COMMENT ON INDEX idx_smartstore_orders_talktalk_created IS 'SmartStore orders list by TalkTalk status';
+
+-- =============================================================================
+-- Migration 008: Dead Letter Unresolved Unique
+-- =============================================================================
+
+-- Migration: One unresolved dead-letter entry per order and job type
+-- Description: Replaces UNIQUE (order_id, job_type) with a partial unique index on unresolved
+-- entries, so an order that exhausts its retries again after being resolved gets a new entry
+
+ALTER TABLE dead_letter_orders DROP CONSTRAINT IF EXISTS dead_letter_orders_order_id_job_type_key;
+
+-- At most one open entry per order and job type (upsert target for the workers)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_dead_letter_orders_unresolved
+  ON dead_letter_orders(order_id, job_type)
+  WHERE resolved_at IS NULL;
+
+-- Comments
+COMMENT ON INDEX uq_dead_letter_orders_unresolved IS 'One unresolved dead-letter entry per order and job type';
+
 -- =============================================================================
 -- Migration Complete!
 -- =============================================================================
@@ -0,0 +1,72 @@
+"""
+API Response Cache
+Short-lived Redis cache for Naver API results keyed by keyword
+"""
+import os
+import json
+import logging
+from typing import Any, Optional
+
+# Optional import - caching is disabled when redis is not installed
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    JSON response cache backed by Redis (SETEX with TTL)
+    Acts as a no-op when REDIS_URL is not configured; Redis errors are
+    logged and treated as cache misses so the APIs are still served
+    Configure the Redis server with maxmemory-policy allkeys-lru so the cache self-trims
+    """
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.client = None
+
+        redis_url = redis_url or os.getenv('REDIS_URL')
+        if not redis_url:
+            return
+        if not HAS_REDIS:
+            logger.warning("⚠️ REDIS_URL is set but redis is not installed, response cache disabled")
+            return
+
+        self.client = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get cached value (None on miss)"""
+        if self.client is None:
+            return None
+
+        try:
+            raw = self.client.get(key)
+        except Exception as e:
+            logger.warning(f"⚠️ Response cache get failed: {str(e)}")
+            return None
+
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl_seconds: int):
+        """Cache value for ttl_seconds"""
+        if self.client is None:
+            return
+
+        try:
+            self.client.setex(key, ttl_seconds, json.dumps(value, ensure_ascii=False))
+        except Exception as e:
+            logger.warning(f"⚠️ Response cache set failed: {str(e)}")
+
+
+# Singleton instance
+_response_cache = None
+
+def get_response_cache() -> ResponseCache:
+    """Get or create response cache instance"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -2,7 +2,7 @@
 Models package - Database models and utilities
 """
 from models.db import Base, engine, Session, get_db, init_db, close_db
-from models.order import Order, OrderStatus, BuyerInfo, AuditLog
+from models.order import Order, OrderStatus, BuyerInfo, AuditLog, DeadLetterOrder
 from models.product import Product
 from models.product_candidate import ProductCandidate, CandidateStatus
 from models.smartstore_order import SmartStoreOrder, SmartStoreOrderStatus, TalkTalkStatus
@@ -18,6 +18,7 @@ __all__ = [
     'OrderStatus',
     'BuyerInfo',
     'AuditLog',
+    'DeadLetterOrder',
     'Product',
     'ProductCandidate',
     'CandidateStatus',
@@ -1,7 +1,7 @@
 """
 Order model - Main order management table
 """
-from sqlalchemy import Column, String, Integer, Numeric, DateTime, Enum, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, BigInteger, Numeric, DateTime, Enum, ForeignKey, Text, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -139,3 +139,25 @@ class AuditLog(Base):
 
     # Relationship
     order = relationship("Order", back_populates="audit_logs")
+
+
+class DeadLetterOrder(Base):
+    """Dead-letter table for orders whose background job exhausted its retries"""
+    __tablename__ = 'dead_letter_orders'
+    __table_args__ = (
+        # One open entry per order and job type; resolved entries are kept as history
+        Index('uq_dead_letter_orders_unresolved', 'order_id', 'job_type', unique=True,
+              postgresql_where=text('resolved_at IS NULL')),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    order_id = Column(UUID(as_uuid=True), ForeignKey('orders.id', ondelete='CASCADE'), nullable=False)
+
+    job_type = Column(String, nullable=False)  # 'purchase', 'forwarder'
+    job_id = Column(String)
+    attempts = Column(Integer, nullable=False)
+    reason = Column(Text)
+    meta = Column(JSONB, default={})
+
+    resolved_at = Column(DateTime(timezone=True))  # Set when an operator has handled the order
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
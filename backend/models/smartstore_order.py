@@ -1,7 +1,7 @@
 """
 SmartStore Order model - Naver SmartStore order management
 """
-from sqlalchemy import Column, String, Integer, Numeric, DateTime, Enum, Text
+from sqlalchemy import Column, String, Integer, Numeric, DateTime, Enum, Text, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 import uuid
@@ -33,6 +33,14 @@ class SmartStoreOrderStatus(str, enum.Enum):
 class SmartStoreOrder(Base):
     """SmartStore order table model"""
     __tablename__ = 'smartstore_orders'
+    __table_args__ = (
+        # Sync worker scans by order/TalkTalk status (see migration 005)
+        Index('idx_smartstore_orders_order_status_talktalk', 'order_status', 'talktalk_status'),
+        # TalkTalk webhook pending customs ID lookup and orders list (see migration 007)
+        Index('idx_smartstore_orders_talktalk_lookup', 'buyer_phone', 'talktalk_status', text('created_at DESC'),
+              postgresql_where=text('customs_id IS NULL')),
+        Index('idx_smartstore_orders_talktalk_created', 'talktalk_status', text('created_at DESC')),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
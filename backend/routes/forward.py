@@ -31,12 +31,24 @@ def send_to_forwarder(order_id):
             }
         }), 400
 
-    # Check if already processed
-    cached = idempotency_store.get(idem_key)
-    if cached:
-        return jsonify(cached['response']), cached['status_code']
-
+    claimed = False
     try:
+        # Claim the key before touching the order, so a retried or concurrent
+        # request replays the stored response instead of running twice
+        claimed = idempotency_store.claim(idem_key)
+        if not claimed:
+            cached = idempotency_store.get(idem_key)
+            if cached:
+                return jsonify(cached['response']), cached['status_code']
+            return jsonify({
+                'ok': False,
+                'error': {
+                    'code': 'REQUEST_IN_PROGRESS',
+                    'message': 'A request with this Idempotency-Key is still being processed',
+                    'details': {}
+                }
+            }), 409
+
         with get_db() as db:
             # Get order
             order = db.query(Order).filter(Order.id == order_id).first()
@@ -50,7 +62,7 @@ def send_to_forwarder(order_id):
                         'details': {}
                     }
                 }
-                idempotency_store.set(idem_key, {'response': response, 'status_code': 404})
+                idempotency_store.set(idem_key, response, 404)
                 return jsonify(response), 404
 
             # Validate order status (must have supplier order completed)
@@ -67,7 +79,7 @@ def send_to_forwarder(order_id):
                         }
                     }
                 }
-                idempotency_store.set(idem_key, {'response': response, 'status_code': 400})
+                idempotency_store.set(idem_key, response, 400)
                 return jsonify(response), 400
 
             # Get request body
@@ -124,11 +136,14 @@ def send_to_forwarder(order_id):
             }
 
             # Cache response
-            idempotency_store.set(idem_key, {'response': response, 'status_code': 202})
+            idempotency_store.set(idem_key, response, 202)
 
             return jsonify(response), 202
 
     except Exception as e:
+        # Let the client retry with the same key
+        if claimed:
+            idempotency_store.release(idem_key)
         return jsonify({
             'ok': False,
             'error': {
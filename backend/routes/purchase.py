@@ -7,13 +7,10 @@ import uuid
 from datetime import datetime
 
 from models import get_db, Order, OrderStatus, AuditLog
-from utils.idempotency import IdempotencyStore
+from utils.idempotency import idempotency_store
 
 bp = Blueprint('purchase', __name__)
 
-# Idempotency store (will be replaced with Redis in Phase 4)
-idempotency_store = IdempotencyStore()
-
 
 @bp.route('/orders/<order_id>/actions/execute-purchase', methods=['POST'])
 def execute_purchase(order_id):
@@ -34,12 +31,24 @@ def execute_purchase(order_id):
             }
         }), 400
 
-    # Check if already processed
-    cached = idempotency_store.get(idem_key)
-    if cached:
-        return jsonify(cached['response']), cached['status_code']
-
+    claimed = False
     try:
+        # Claim the key before touching the order, so a retried or concurrent
+        # request replays the stored response instead of running twice
+        claimed = idempotency_store.claim(idem_key)
+        if not claimed:
+            cached = idempotency_store.get(idem_key)
+            if cached:
+                return jsonify(cached['response']), cached['status_code']
+            return jsonify({
+                'ok': False,
+                'error': {
+                    'code': 'REQUEST_IN_PROGRESS',
+                    'message': 'A request with this Idempotency-Key is still being processed',
+                    'details': {}
+                }
+            }), 409
+
         with get_db() as db:
             # Get order
             order = db.query(Order).filter(Order.id == order_id).first()
@@ -53,7 +62,7 @@ def execute_purchase(order_id):
                         'details': {}
                     }
                 }
-                idempotency_store.set(idem_key, {'response': response, 'status_code': 404})
+                idempotency_store.set(idem_key, response, 404)
                 return jsonify(response), 404
 
             # Validate order status
@@ -66,7 +75,7 @@ def execute_purchase(order_id):
                         'details': {'current_status': order.status.value}
                     }
                 }
-                idempotency_store.set(idem_key, {'response': response, 'status_code': 400})
+                idempotency_store.set(idem_key, response, 400)
                 return jsonify(response), 400
 
             # Get request body
@@ -82,12 +91,15 @@ def execute_purchase(order_id):
             order.status = OrderStatus.SUPPLIER_ORDERING
             order.updated_at = datetime.utcnow()
 
-            # Update metadata
-            if not order.meta:
-                order.meta = {}
-            order.meta['purchase_job_id'] = job_id
-            order.meta['payment_method'] = payment_method
-            order.meta['constraints'] = constraints
+            # Update metadata (reassigned so the JSONB change is persisted);
+            # a fresh execution also clears any stale in-flight supplier request marker
+            meta = dict(order.meta or {})
+            meta.pop('supplier_job_id', None)
+            meta.pop('supplier_job_claimed_at', None)
+            meta['purchase_job_id'] = job_id
+            meta['payment_method'] = payment_method
+            meta['constraints'] = constraints
+            order.meta = meta
 
             if supplier_override:
                 order.supplier_id = supplier_override.get('supplier_id')
@@ -128,11 +140,14 @@ def execute_purchase(order_id):
             }
 
             # Cache response
-            idempotency_store.set(idem_key, {'response': response, 'status_code': 202})
+            idempotency_store.set(idem_key, response, 202)
 
             return jsonify(response), 202
 
     except Exception as e:
+        # Let the client retry with the same key
+        if claimed:
+            idempotency_store.release(idem_key)
         return jsonify({
             'ok': False,
             'error': {
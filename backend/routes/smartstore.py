@@ -2,13 +2,19 @@
 SmartStore API routes
 Handles product registration to Naver SmartStore
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+import hashlib
+import json
 import logging
+import orjson
 import os
+import uuid
 import requests
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional
 from datetime import datetime
-from sqlalchemy import text
+from sqlalchemy import text, update, func, cast, tuple_, Text
+from sqlalchemy.dialects.postgresql import JSONB
 
 from models import get_db, Product, SmartStoreOrder, SmartStoreOrderStatus, TalkTalkStatus
 from connectors.naver_commerce_api import get_naver_commerce_api
@@ -22,6 +28,18 @@ logger = logging.getLogger(__name__)
 # AWS EC2 proxy endpoint (for Naver API IP whitelist)
 AWS_EC2_ENDPOINT = os.getenv('AWS_EC2_ENDPOINT', 'http://98.94.199.189:8080')
 
+# Concurrent product registrations / Naver image uploads per request
+REGISTER_WORKERS = int(os.getenv('SMARTSTORE_REGISTER_WORKERS', '4'))
+NAVER_UPLOAD_WORKERS = int(os.getenv('NAVER_UPLOAD_WORKERS', '8'))
+
+# Streaming registration results (opt-in with "Accept: application/x-ndjson")
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def _json(payload: dict, status: int = 200) -> Response:
+    """Serialize large list responses with orjson"""
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
 
 @bp.route('/smartstore/categories', methods=['GET'])
 def get_categories():
@@ -102,7 +120,7 @@ def suggest_category():
 
         if use_aws_proxy:
             proxy_url = f"{AWS_EC2_ENDPOINT}/api/v1/smartstore/suggest-category"
-            logger.info(f"🔄 Proxying category suggestion to AWS EC2: {proxy_url}")
+            logger.info("🔄 Proxying category suggestion to AWS EC2: %s", proxy_url)
             try:
                 # Forward entire request to AWS EC2
                 aws_response = requests.post(
@@ -112,7 +130,7 @@ def suggest_category():
                     timeout=60  # AI analysis may take longer
                 )
 
-                logger.info(f"✅ AWS EC2 response: status={aws_response.status_code}")
+                logger.info("✅ AWS EC2 response: status=%s", aws_response.status_code)
                 # Return AWS EC2 response
                 return jsonify(aws_response.json()), aws_response.status_code
 
@@ -177,7 +195,7 @@ def suggest_category():
                 }
             }), 400
 
-        logger.info(f"🤖 Analyzing product for category suggestion: {product_data.get('title', '')[:50]}...")
+        logger.info("🤖 Analyzing product for category suggestion: %s...", product_data.get('title', '')[:50])
 
         # Get Naver categories
         naver_api = get_naver_commerce_api()
@@ -213,7 +231,7 @@ def suggest_category():
                 }
             }), 200
 
-        logger.info(f"✅ Generated {len(suggestions)} category suggestions")
+        logger.info("✅ Generated %s category suggestions", len(suggestions))
 
         return jsonify({
             'ok': True,
@@ -275,6 +293,10 @@ def register_products():
         }
     }
 
+    With "Accept: application/x-ndjson" the response is streamed instead:
+    one result object per line as each product finishes (completion order),
+    then a final {summary: {...}} line.
+
     How AI Category Selection Works:
     1. If use_ai_category=true (default) and category_id is NOT provided:
        - AI analyzes each product's title/description
@@ -287,20 +309,34 @@ def register_products():
     try:
         # Check if we should proxy to AWS EC2 (for Naver IP whitelist)
         use_aws_proxy = os.getenv('USE_AWS_PROXY', 'false').lower() == 'true'
+        wants_stream = NDJSON_MIMETYPE in request.headers.get('Accept', '')
 
         if use_aws_proxy:
             proxy_url = f"{AWS_EC2_ENDPOINT}/api/v1/smartstore/register-products"
-            logger.info(f"🔄 Proxying Naver API request to AWS EC2: {proxy_url}")
+            logger.info("🔄 Proxying Naver API request to AWS EC2: %s", proxy_url)
             try:
                 # Forward entire request to AWS EC2
                 aws_response = requests.post(
                     proxy_url,
                     json=request.get_json(force=True),
-                    headers={'Content-Type': 'application/json'},
-                    timeout=180  # 3 minutes for product registration
+                    headers={
+                        'Content-Type': 'application/json',
+                        'Accept': NDJSON_MIMETYPE if wants_stream else 'application/json'
+                    },
+                    timeout=180,  # 3 minutes for product registration
+                    stream=wants_stream
                 )
 
-                logger.info(f"✅ AWS EC2 response: status={aws_response.status_code}, body={aws_response.text[:200]}")
+                if wants_stream:
+                    # Relay result lines as AWS EC2 produces them
+                    logger.info("✅ AWS EC2 streaming response: status=%s", aws_response.status_code)
+                    return Response(
+                        stream_with_context(aws_response.iter_content(chunk_size=None)),
+                        status=aws_response.status_code,
+                        mimetype=aws_response.headers.get('Content-Type', NDJSON_MIMETYPE)
+                    )
+
+                logger.info("✅ AWS EC2 response: status=%s, body=%s", aws_response.status_code, aws_response.text[:200])
                 # Return AWS EC2 response
                 return jsonify(aws_response.json()), aws_response.status_code
 
@@ -356,10 +392,10 @@ def register_products():
         manufacturer = settings.get('manufacturer', '')
         use_ai_category = settings.get('use_ai_category', True)  # Enable AI auto-category by default
 
-        logger.info(f"📦 Starting SmartStore registration for {len(product_ids)} products")
-        logger.info(f"🤖 AI auto-category: {'Enabled' if use_ai_category else 'Disabled'}")
+        logger.info("📦 Starting SmartStore registration for %s products", len(product_ids))
+        logger.info("🤖 AI auto-category: %s", 'Enabled' if use_ai_category else 'Disabled')
         if default_category_id:
-            logger.info(f"📋 Default category ID: {default_category_id}")
+            logger.info("📋 Default category ID: %s", default_category_id)
 
         # Initialize Naver Commerce API and AI Category Analyzer
         naver_api = get_naver_commerce_api()
@@ -373,251 +409,47 @@ def register_products():
                 categories_result = naver_api.get_categories()
                 if categories_result.get('success'):
                     naver_categories = categories_result.get('categories', [])
-                    logger.info(f"✅ Loaded {len(naver_categories)} categories for AI analysis")
+                    logger.info("✅ Loaded %s categories for AI analysis", len(naver_categories))
                 else:
                     logger.warning("⚠️ Failed to load categories for AI, will use default category")
                     use_ai_category = False
             except Exception as e:
-                logger.warning(f"⚠️ AI category analyzer initialization failed: {str(e)}")
+                logger.warning("⚠️ AI category analyzer initialization failed: %s", e)
                 use_ai_category = False
 
-        # Results tracking
-        results = []
-        success_count = 0
-        failed_count = 0
-
-        # Process each product
-        with get_db() as db:
-            for product_id in product_ids:
-                try:
-                    # Get product from database
-                    product = db.query(Product).filter(Product.id == product_id).first()
-
-                    if not product:
-                        logger.warning(f"⚠️ Product {product_id} not found")
-                        results.append({
-                            'product_id': product_id,
-                            'success': False,
-                            'error': 'Product not found'
-                        })
-                        failed_count += 1
-                        continue
-
-                    logger.info(f"🔄 Processing: {product.title[:50]}...")
-
-                    # Debug: Check product.data structure
-                    logger.info(f"🔍 product.data type: {type(product.data)}")
-                    logger.info(f"🔍 product.data keys: {product.data.keys() if product.data else 'None'}")
-                    logger.info(f"🔍 product.data['options'] exists: {'options' in product.data if product.data else False}")
-                    logger.info(f"🔍 product.data['variants'] exists: {'variants' in product.data if product.data else False}")
-                    if product.data and 'variants' in product.data:
-                        logger.info(f"🔍 product.data['variants'] length: {len(product.data['variants'])}")
-
-                    # Step 0: Category Selection (prioritize cached category from frontend)
-                    product_category_id = default_category_id  # Default to user-provided or DB category
-                    ai_category_info = None
-
-                    # Check if frontend provided a specific category for this product
-                    if product_id in product_categories:
-                        product_category_id = product_categories[product_id]
-                        logger.info(f"📋 Using cached category from frontend: {product_category_id}")
-                    elif use_ai_category and category_analyzer and naver_categories:
-                        try:
-                            logger.info("🤖 Step 0/4: AI category analysis...")
-                            product_data_for_ai = {
-                                'title': product.title,
-                                'price': product.price,
-                                'desc': product.data.get('description', '') if product.data else ''
-                            }
-
-                            suggestions = category_analyzer.suggest_categories(
-                                product_data=product_data_for_ai,
-                                categories_tree=naver_categories,
-                                top_k=3
-                            )
-
-                            if suggestions and len(suggestions) > 0:
-                                # Use the highest confidence category
-                                best_suggestion = suggestions[0]
-                                product_category_id = best_suggestion['category_id']
-                                ai_category_info = {
-                                    'category_id': best_suggestion['category_id'],
-                                    'category_path': best_suggestion['category_path'],
-                                    'confidence': best_suggestion['confidence'],
-                                    'reason': best_suggestion['reason']
-                                }
-                                logger.info(f"✅ AI selected category: {best_suggestion['category_path']} ({best_suggestion['confidence']}% confidence)")
-                            else:
-                                logger.warning("⚠️ AI returned no suggestions, using default category")
-                                if not product_category_id:
-                                    logger.error("❌ No category available (AI failed + no default)")
-                                    results.append({
-                                        'product_id': str(product.id),
-                                        'product_name': product.title,
-                                        'success': False,
-                                        'error': 'No category available: AI failed and no default category set'
-                                    })
-                                    failed_count += 1
-                                    continue
-
-                        except Exception as ai_error:
-                            logger.warning(f"⚠️ AI category analysis failed: {str(ai_error)}, using default")
-                            if not product_category_id:
-                                logger.error("❌ No category available (AI failed + no default)")
-                                results.append({
-                                    'product_id': str(product.id),
-                                    'product_name': product.title,
-                                    'success': False,
-                                    'error': f'AI category analysis failed and no default category: {str(ai_error)}'
-                                })
-                                failed_count += 1
-                                continue
-                    elif not product_category_id:
-                        # No AI and no default category
-                        logger.error("❌ No category available (AI disabled + no default)")
-                        results.append({
-                            'product_id': str(product.id),
-                            'product_name': product.title,
-                            'success': False,
-                            'error': 'No category available: AI disabled and no default category set'
-                        })
-                        failed_count += 1
-                        continue
-
-                    logger.info(f"📋 Using category ID: {product_category_id}")
-
-                    # Step 1: Upload images to Naver
-                    logger.info("📷 Step 1/3: Uploading images to Naver...")
-                    image_ids = []
-                    uploaded_local_images = []  # Track uploaded local images for cleanup
-
-                    # Upload main images
-                    main_images = product.data.get('downloaded_images', [])
-                    if not main_images:
-                        main_images = product.data.get('images', [])
-
-                    for img_url in main_images[:5]:  # Max 5 main images
-                        try:
-                            image_id = naver_api.upload_image(img_url)
-                            if image_id:
-                                image_ids.append(image_id)
-                                # Track local file path for cleanup (if it's a local file)
-                                if img_url.startswith('/') or 'storage/images/' in img_url:
-                                    uploaded_local_images.append(img_url)
-                        except Exception as e:
-                            logger.warning(f"⚠️ Failed to upload image {img_url}: {str(e)}")
-
-                    if len(image_ids) == 0:
-                        logger.error(f"❌ No images uploaded for product {product_id}")
-                        results.append({
-                            'product_id': str(product.id),
-                            'product_name': product.title,
-                            'success': False,
-                            'error': 'Failed to upload images'
-                        })
-                        failed_count += 1
-                        continue
-
-                    # Step 2: Upload description images and build detail HTML
-                    logger.info("📝 Step 2/3: Uploading description images and building detail HTML...")
-
-                    # Upload description images to Naver
-                    desc_image_urls = []
-                    desc_images = product.data.get('downloaded_desc_imgs', [])
-                    if not desc_images:
-                        desc_images = product.data.get('desc_imgs', [])
-
-                    # Add shipping notice as first image
-                    shipping_notice_url = f"{os.getenv('RAILWAY_PUBLIC_DOMAIN', 'https://buypilot-production.up.railway.app')}/shipping-notice.png"
-                    desc_images_with_notice = [shipping_notice_url] + list(desc_images[:19])  # shipping notice + 19 others = 20 max
-
-                    for desc_img_url in desc_images_with_notice:
-                        try:
-                            uploaded_desc_img = naver_api.upload_image(desc_img_url)
-                            if uploaded_desc_img:
-                                desc_image_urls.append(uploaded_desc_img)
-                        except Exception as e:
-                            logger.warning(f"⚠️ Failed to upload description image {desc_img_url}: {str(e)}")
-
-                    detail_html = _build_detail_html_from_uploaded_images(desc_image_urls)
-
-                    # Step 3: Prepare product data
-                    logger.info("📦 Step 3/3: Registering product...")
-
-                    # Get final selling price
-                    final_price = _calculate_final_price(product)
-
-                    product_data = naver_api.build_product_data(
-                        name=product.title,
-                        price=final_price,
-                        stock=stock_quantity,
-                        image_ids=image_ids,
-                        detail_html=detail_html,
-                        category_id=product_category_id,
-                        origin_area=origin_area,
-                        brand=brand,
-                        manufacturer=manufacturer,
-                        options=product.data.get('options', []),
-                        variants=product.data.get('variants', [])
-                    )
-
-                    # Register product
-                    result = naver_api.register_product(product_data)
-
-                    if result.get('success'):
-                        # Update product with SmartStore info
-                        if not product.data:
-                            product.data = {}
+        # Registration settings shared by all products
+        registration_settings = {
+            'default_category_id': default_category_id,
+            'product_categories': product_categories,
+            'stock_quantity': stock_quantity,
+            'origin_area': origin_area,
+            'brand': brand,
+            'manufacturer': manufacturer,
+            'use_ai_category': use_ai_category,
+            'category_analyzer': category_analyzer,
+            'naver_categories': naver_categories
+        }
 
-                        product.data['smartstore_product_id'] = result.get('product_id')
-                        product.data['smartstore_registered_at'] = datetime.utcnow().isoformat()
-                        product.data['smartstore_status'] = 'registered'
+        outcomes = _iter_registration_results(naver_api, product_ids, registration_settings)
 
-                        db.commit()
+        # Streaming mode: one NDJSON line per product as it finishes, then a summary line
+        if wants_stream:
+            return Response(
+                stream_with_context(_stream_registration_results(outcomes, len(product_ids))),
+                mimetype=NDJSON_MIMETYPE
+            )
 
-                        logger.info(f"✅ Product registered: {result.get('product_id')}")
+        # Results tracking (request order)
+        results = [None] * len(product_ids)
+        success_count = 0
+        failed_count = 0
 
-                        # 🗑️ Cleanup: Delete uploaded local images (free tier disk space management)
-                        if uploaded_local_images:
-                            try:
-                                image_service = get_image_service()
-                                deleted_count = image_service.delete_images(uploaded_local_images)
-                                logger.info(f"🗑️ Cleaned up {deleted_count} local images after successful upload")
-                            except Exception as cleanup_error:
-                                logger.warning(f"⚠️ Image cleanup failed (non-critical): {str(cleanup_error)}")
-
-                        result_data = {
-                            'product_id': str(product.id),
-                            'product_name': product.title,
-                            'success': True,
-                            'smartstore_product_id': result.get('product_id'),
-                            'smartstore_url': f"https://smartstore.naver.com/product/{result.get('product_id')}"
-                        }
-
-                        # Add AI category info if available
-                        if ai_category_info:
-                            result_data['ai_category'] = ai_category_info
-
-                        results.append(result_data)
-                        success_count += 1
-                    else:
-                        logger.error(f"❌ Registration failed: {result.get('error')}")
-                        results.append({
-                            'product_id': str(product.id),
-                            'product_name': product.title,
-                            'success': False,
-                            'error': result.get('error', 'Unknown error')
-                        })
-                        failed_count += 1
-
-                except Exception as e:
-                    logger.error(f"❌ Error processing product {product_id}: {str(e)}", exc_info=True)
-                    results.append({
-                        'product_id': str(product_id),
-                        'success': False,
-                        'error': str(e)
-                    })
-                    failed_count += 1
+        for index, result_data in outcomes:
+            results[index] = result_data
+            if result_data['success']:
+                success_count += 1
+            else:
+                failed_count += 1
 
         # Return results
         return jsonify({
@@ -644,6 +476,373 @@ def register_products():
         }), 500
 
 
+def _iter_registration_results(naver_api, product_ids: List[str], settings: Dict):
+    """
+    Register products concurrently, yielding (index, result_data) as each one finishes
+
+    Products are loaded in one IN query and detached from the session, so worker
+    threads can read them while this (request) thread writes SmartStore info with
+    plain UPDATEs, committed as each product finishes - also when a streaming
+    client disconnects early, in which case the remaining registrations are still
+    awaited and recorded.
+    """
+    local_images_to_cleanup = []
+
+    with get_db() as db:
+        # Load all products in one IN query; malformed IDs are reported as not found
+        canonical_ids = [_canonical_uuid(product_id) for product_id in product_ids]
+        valid_ids = [canonical_id for canonical_id in canonical_ids if canonical_id]
+        products_by_id = {
+            str(product.id): product
+            for product in db.query(Product).filter(Product.id.in_(valid_ids)).all()
+        } if valid_ids else {}
+
+        # Detach: workers only read loaded attributes, commits won't expire them
+        db.expunge_all()
+
+        registered_at = datetime.utcnow().isoformat()
+
+        # Process products concurrently - each is pure Naver API I/O (AI category,
+        # image uploads, registration). Image uploads of all products share one
+        # bounded pool to stay within Naver rate limits.
+        with ThreadPoolExecutor(max_workers=NAVER_UPLOAD_WORKERS) as upload_pool, \
+                ThreadPoolExecutor(max_workers=REGISTER_WORKERS) as register_pool:
+            # Submit everything before yielding anything, so a client disconnect
+            # at any yield still reaches the finally below
+            pending = {}
+            not_found = []
+            for index, (product_id, canonical_id) in enumerate(zip(product_ids, canonical_ids)):
+                product = products_by_id.get(canonical_id)
+                if not product:
+                    logger.warning("⚠️ Product %s not found", product_id)
+                    not_found.append((index, {
+                        'product_id': product_id,
+                        'success': False,
+                        'error': 'Product not found'
+                    }))
+                    continue
+
+                future = register_pool.submit(
+                    _register_single_product, naver_api, upload_pool, product_id, product, settings
+                )
+                pending[future] = (index, product)
+
+            try:
+                yield from not_found
+
+                for future in as_completed(list(pending)):
+                    index, product = pending.pop(future)
+                    yield index, _record_registration(db, future, product, registered_at, local_images_to_cleanup)
+            finally:
+                # Client went away mid-stream: still record registrations that complete
+                for future, (_, product) in pending.items():
+                    _record_registration(db, future, product, registered_at, local_images_to_cleanup)
+
+    # 🗑️ Cleanup: Delete uploaded local images (free tier disk space management)
+    if local_images_to_cleanup:
+        try:
+            image_service = get_image_service()
+            deleted_count = image_service.delete_images(local_images_to_cleanup)
+            logger.info("🗑️ Cleaned up %s local images after successful upload", deleted_count)
+        except Exception as cleanup_error:
+            logger.warning("⚠️ Image cleanup failed (non-critical): %s", cleanup_error)
+
+
+def _record_registration(db, future, product: Product, registered_at: str, local_images_to_cleanup: List[str]):
+    """
+    Save SmartStore info for a finished registration (request thread)
+    Committed per product, so products already created on Naver stay recorded
+    even if a later product's update fails or the worker dies mid-batch
+
+    Returns:
+        result_data for the API response
+    """
+    result_data, smartstore_product_id, uploaded_local_images, data_updates = future.result()
+
+    # A complete detail HTML cache is kept even when registration failed so a retry skips re-uploading
+    data_updates = dict(data_updates)
+    if result_data['success']:
+        # Update product with SmartStore info
+        data_updates.update({
+            'smartstore_product_id': smartstore_product_id,
+            'smartstore_registered_at': registered_at,
+            'smartstore_status': 'registered'
+        })
+        local_images_to_cleanup.extend(uploaded_local_images)
+
+    if data_updates:
+        try:
+            # Merged into the JSONB column server-side
+            db.execute(
+                update(Product)
+                .where(Product.id == product.id)
+                .values(data=func.coalesce(Product.data, cast({}, JSONB)).op('||')(cast(data_updates, JSONB)))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Failed to save SmartStore info for product {product.id}: {str(e)}", exc_info=True)
+
+    return result_data
+
+
+def _stream_registration_results(outcomes, total: int):
+    """Yield NDJSON lines: one result per product, then the summary"""
+    success_count = 0
+    failed_count = 0
+
+    for _, result_data in outcomes:
+        if result_data['success']:
+            success_count += 1
+        else:
+            failed_count += 1
+        yield json.dumps(result_data, ensure_ascii=False) + '\n'
+
+    yield json.dumps({
+        'summary': {
+            'total': total,
+            'success': success_count,
+            'failed': failed_count
+        }
+    }) + '\n'
+
+
+def _canonical_uuid(value) -> Optional[str]:
+    """Normalize a UUID string (None if malformed)"""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+def _upload_images_to_naver(naver_api, upload_pool, image_urls: List[str], label: str) -> List:
+    """
+    Upload images to Naver in batched requests (downloads run on the shared upload pool)
+
+    Returns:
+        (image_url, naver_image_id or None) pairs in input order
+    """
+    try:
+        uploaded = naver_api.upload_images_batch(image_urls, executor=upload_pool)
+    except Exception as e:
+        logger.warning("⚠️ Failed to upload %ss: %s", label, e)
+        uploaded = [None] * len(image_urls)
+
+    for img_url, image_id in zip(image_urls, uploaded):
+        if not image_id:
+            logger.warning("⚠️ Failed to upload %s %s", label, img_url)
+
+    return list(zip(image_urls, uploaded))
+
+
+def _register_single_product(naver_api, upload_pool, product_id: str, product: Product, settings: Dict):
+    """
+    Register one product to SmartStore (runs on a worker thread)
+    Only reads the product - database writes happen on the request thread
+
+    Returns:
+        (result_data, smartstore_product_id, uploaded_local_images, data_updates)
+        data_updates holds product.data fields to merge (detail HTML cache)
+    """
+    try:
+        logger.info("🔄 Processing: %s...", product.title[:50])
+
+        # Read the JSONB payload once; everything below indexes this local
+        pdata = product.data or {}
+
+        # Debug: Check product.data structure
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("🔍 product.data type: %s", type(product.data))
+            logger.info("🔍 product.data keys: %s", pdata.keys() if pdata else 'None')
+            logger.info("🔍 product.data['options'] exists: %s", 'options' in pdata)
+            logger.info("🔍 product.data['variants'] exists: %s", 'variants' in pdata)
+            if 'variants' in pdata:
+                logger.info("🔍 product.data['variants'] length: %s", len(pdata['variants']))
+
+        # Step 0: Category Selection (prioritize cached category from frontend)
+        product_category_id = settings['default_category_id']  # Default to user-provided or DB category
+        ai_category_info = None
+        category_analyzer = settings['category_analyzer']
+        naver_categories = settings['naver_categories']
+
+        # Check if frontend provided a specific category for this product
+        if product_id in settings['product_categories']:
+            product_category_id = settings['product_categories'][product_id]
+            logger.info("📋 Using cached category from frontend: %s", product_category_id)
+        elif settings['use_ai_category'] and category_analyzer and naver_categories:
+            try:
+                logger.info("🤖 Step 0/4: AI category analysis...")
+                product_data_for_ai = {
+                    'title': product.title,
+                    'price': product.price,
+                    'desc': pdata.get('description', '')
+                }
+
+                suggestions = category_analyzer.suggest_categories(
+                    product_data=product_data_for_ai,
+                    categories_tree=naver_categories,
+                    top_k=3
+                )
+
+                if suggestions and len(suggestions) > 0:
+                    # Use the highest confidence category
+                    best_suggestion = suggestions[0]
+                    product_category_id = best_suggestion['category_id']
+                    ai_category_info = {
+                        'category_id': best_suggestion['category_id'],
+                        'category_path': best_suggestion['category_path'],
+                        'confidence': best_suggestion['confidence'],
+                        'reason': best_suggestion['reason']
+                    }
+                    logger.info("✅ AI selected category: %s (%s%% confidence)", best_suggestion['category_path'], best_suggestion['confidence'])
+                else:
+                    logger.warning("⚠️ AI returned no suggestions, using default category")
+                    if not product_category_id:
+                        logger.error("❌ No category available (AI failed + no default)")
+                        return {
+                            'product_id': str(product.id),
+                            'product_name': product.title,
+                            'success': False,
+                            'error': 'No category available: AI failed and no default category set'
+                        }, None, [], {}
+
+            except Exception as ai_error:
+                logger.warning("⚠️ AI category analysis failed: %s, using default", ai_error)
+                if not product_category_id:
+                    logger.error("❌ No category available (AI failed + no default)")
+                    return {
+                        'product_id': str(product.id),
+                        'product_name': product.title,
+                        'success': False,
+                        'error': f'AI category analysis failed and no default category: {str(ai_error)}'
+                    }, None, [], {}
+        elif not product_category_id:
+            # No AI and no default category
+            logger.error("❌ No category available (AI disabled + no default)")
+            return {
+                'product_id': str(product.id),
+                'product_name': product.title,
+                'success': False,
+                'error': 'No category available: AI disabled and no default category set'
+            }, None, [], {}
+
+        logger.info("📋 Using category ID: %s", product_category_id)
+
+        # Step 1: Upload images to Naver
+        logger.info("📷 Step 1/3: Uploading images to Naver...")
+        image_ids = []
+        uploaded_local_images = []  # Track uploaded local images for cleanup
+
+        # Upload main images
+        main_images = pdata.get('downloaded_images') or pdata.get('images') or []
+
+        for img_url, image_id in _upload_images_to_naver(naver_api, upload_pool, main_images[:5], 'image'):  # Max 5 main images
+            if image_id:
+                image_ids.append(image_id)
+                # Track local file path for cleanup (if it's a local file)
+                if img_url.startswith('/') or 'storage/images/' in img_url:
+                    uploaded_local_images.append(img_url)
+
+        if len(image_ids) == 0:
+            logger.error(f"❌ No images uploaded for product {product_id}")
+            return {
+                'product_id': str(product.id),
+                'product_name': product.title,
+                'success': False,
+                'error': 'Failed to upload images'
+            }, None, [], {}
+
+        # Step 2: Upload description images and build detail HTML
+        logger.info("📝 Step 2/3: Uploading description images and building detail HTML...")
+
+        # Upload description images to Naver
+        desc_images = pdata.get('downloaded_desc_imgs') or pdata.get('desc_imgs') or []
+
+        # Add shipping notice as first image
+        shipping_notice_url = f"{os.getenv('RAILWAY_PUBLIC_DOMAIN', 'https://buypilot-production.up.railway.app')}/shipping-notice.png"
+        desc_images_with_notice = [shipping_notice_url] + list(desc_images[:19])  # shipping notice + 19 others = 20 max
+
+        # Reuse the detail HTML from a previous attempt when the description images are unchanged
+        data_updates = {}
+        desc_images_hash = _detail_images_hash(desc_images_with_notice)
+        cached_detail_html = pdata.get('detail_html_cache')
+        if cached_detail_html and pdata.get('detail_html_hash') == desc_images_hash:
+            logger.info("⚡ Reusing cached detail HTML (description images unchanged)")
+            detail_html = cached_detail_html
+        else:
+            desc_image_urls = [
+                uploaded_desc_img
+                for _, uploaded_desc_img in _upload_images_to_naver(naver_api, upload_pool, desc_images_with_notice, 'description image')
+                if uploaded_desc_img
+            ]
+
+            detail_html = _build_detail_html_from_uploaded_images(desc_image_urls)
+
+            # Cache only a complete page; a retry re-uploads when any image failed
+            if len(desc_image_urls) == len(desc_images_with_notice):
+                data_updates = {'detail_html_hash': desc_images_hash, 'detail_html_cache': detail_html}
+            else:
+                logger.warning("⚠️ %d/%d description images uploaded, detail HTML not cached",
+                               len(desc_image_urls), len(desc_images_with_notice))
+
+        # Step 3: Prepare product data
+        logger.info("📦 Step 3/3: Registering product...")
+
+        # Get final selling price
+        final_price = _calculate_final_price(product)
+
+        product_data = naver_api.build_product_data(
+            name=product.title,
+            price=final_price,
+            stock=settings['stock_quantity'],
+            image_ids=image_ids,
+            detail_html=detail_html,
+            category_id=product_category_id,
+            origin_area=settings['origin_area'],
+            brand=settings['brand'],
+            manufacturer=settings['manufacturer'],
+            options=pdata.get('options', []),
+            variants=pdata.get('variants', [])
+        )
+
+        # Register product
+        result = naver_api.register_product(product_data)
+
+        if not result.get('success'):
+            logger.error(f"❌ Registration failed: {result.get('error')}")
+            return {
+                'product_id': str(product.id),
+                'product_name': product.title,
+                'success': False,
+                'error': result.get('error', 'Unknown error')
+            }, None, [], data_updates
+
+        logger.info("✅ Product registered: %s", result.get('product_id'))
+
+        result_data = {
+            'product_id': str(product.id),
+            'product_name': product.title,
+            'success': True,
+            'smartstore_product_id': result.get('product_id'),
+            'smartstore_url': f"https://smartstore.naver.com/product/{result.get('product_id')}"
+        }
+
+        # Add AI category info if available
+        if ai_category_info:
+            result_data['ai_category'] = ai_category_info
+
+        return result_data, result.get('product_id'), uploaded_local_images, data_updates
+
+    except Exception as e:
+        logger.error(f"❌ Error processing product {product_id}: {str(e)}", exc_info=True)
+        return {
+            'product_id': str(product_id),
+            'success': False,
+            'error': str(e)
+        }, None, [], {}
+
+
 def _build_detail_html_from_uploaded_images(uploaded_image_urls: List[str]) -> str:
     """
     Build HTML detail content from uploaded Naver image URLs
@@ -654,18 +853,20 @@ def _build_detail_html_from_uploaded_images(uploaded_image_urls: List[str]) -> s
     Returns:
         HTML string for product detail page
     """
-    html_parts = []
-
-    if uploaded_image_urls and len(uploaded_image_urls) > 0:
-        html_parts.append('<div style="width: 100%;">')
-        for img_url in uploaded_image_urls:
-            html_parts.append(f'<img src="{img_url}" alt="상품 상세" style="max-width: 100%; height: auto; display: block;" />')
-        html_parts.append('</div>')
-    else:
+    if not uploaded_image_urls:
         # Default content if no description images
-        html_parts.append('<div style="padding: 20px; text-align: center;">상품 상세 설명</div>')
+        return '<div style="padding: 20px; text-align: center;">상품 상세 설명</div>'
+
+    images = '\n'.join(
+        f'<img src="{img_url}" alt="상품 상세" style="max-width: 100%; height: auto; display: block;" />'
+        for img_url in uploaded_image_urls
+    )
+    return f'<div style="width: 100%;">\n{images}\n</div>'
 
-    return '\n'.join(html_parts)
+
+def _detail_images_hash(image_urls: List[str]) -> str:
+    """Short hash of the description image list (detail HTML cache key)"""
+    return hashlib.blake2b('\n'.join(image_urls).encode(), digest_size=8).hexdigest()
 
 
 def _calculate_final_price(product: Product) -> int:
@@ -679,24 +880,26 @@ def _calculate_final_price(product: Product) -> int:
     Returns:
         Final price in KRW
     """
+    pdata = product.data or {}
+
     # Priority 1: Use frontend calculated final price (주황색 가격)
-    if 'final_price' in product.data and product.data['final_price']:
-        final_price = int(product.data['final_price'])
-        logger.info(f"Using frontend calculated price: {final_price:,}원")
+    if pdata.get('final_price'):
+        final_price = int(pdata['final_price'])
+        logger.info("Using frontend calculated price: %s원", format(final_price, ','))
         return final_price
 
     # Priority 2: Calculate from stored pricing data
     cost_price = int(product.price * 200) if product.price else 0
-    shipping_cost = product.data.get('shipping_cost', 8000)
-    margin = product.data.get('margin', 25)
+    shipping_cost = pdata.get('shipping_cost', 8000)
+    margin = pdata.get('margin', 25)
 
-    total_cost = cost_price + shipping_cost
-    final_price = int(total_cost * (1 + margin / 100))
+    # Integer math: no float rounding error (10,400 at 15% is 11,960, not 11,959)
+    final_price = int((cost_price + shipping_cost) * (100 + margin) // 100)
 
     # Round to nearest 10 (Naver requires 10-won units)
-    final_price = round(final_price / 10) * 10
+    final_price = (final_price + 5) // 10 * 10
 
-    logger.info(f"Calculated price: {final_price:,}원 (cost:{cost_price:,} + ship:{shipping_cost:,} + margin:{margin}%)")
+    logger.info("Calculated price: %s원 (cost:%s + ship:%s + margin:%s%%)", format(final_price, ','), format(cost_price, ','), format(shipping_cost, ','), margin)
     return final_price
 
 
@@ -704,29 +907,73 @@ def _calculate_final_price(product: Product) -> int:
 # SmartStore Order Management
 # =============================================================================
 
+def _order_json_column():
+    """
+    SQL expression rendering a smartstore_orders row as JSON text
+    (same keys as SmartStoreOrder.to_dict, built by Postgres instead of the ORM)
+    """
+    args = []
+    for column in SmartStoreOrder.__table__.columns:
+        value = func.coalesce(column, cast({}, JSONB)) if column.key == 'meta' else column
+        args.extend((column.key, value))
+
+    # Cast to text so the driver hands back the JSON string instead of parsing it
+    return cast(func.json_build_object(*args), Text).label('order_json')
+
+
+def _encode_order_cursor(order) -> str:
+    """Keyset cursor for the orders list: '<created_at ISO>|<id>'"""
+    return f"{order.created_at.isoformat()}|{order.id}"
+
+
+def _decode_order_cursor(cursor: str) -> Optional[tuple]:
+    """Parse an orders list cursor into (created_at, id) (None if malformed)"""
+    created_at, _, order_id = cursor.rpartition('|')
+    order_id = _canonical_uuid(order_id)
+    if not created_at or not order_id:
+        return None
+    try:
+        return datetime.fromisoformat(created_at), uuid.UUID(order_id)
+    except ValueError:
+        return None
+
+
 @bp.route('/smartstore/orders', methods=['GET'])
 def get_smartstore_orders():
     """
-    Get list of SmartStore orders
+    Get list of SmartStore orders (newest first, keyset pagination)
 
     Query params:
         status: Filter by order status
         talktalk_status: Filter by TalkTalk status
         limit: Number of results (default 50)
-        offset: Offset for pagination (default 0)
+        cursor: next_cursor from the previous page (omit for the first page)
 
-    Returns: {ok: bool, data: {orders: [...], total: number}}
+    Returns: {ok: bool, data: {orders: [...], limit: number, next_cursor: string|null}}
     """
     try:
         # Get query parameters
         status = request.args.get('status')
         talktalk_status = request.args.get('talktalk_status')
         limit = int(request.args.get('limit', 50))
-        offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor')
+
+        seek = None
+        if cursor:
+            seek = _decode_order_cursor(cursor)
+            if seek is None:
+                return jsonify({
+                    'ok': False,
+                    'error': {
+                        'code': 'VALIDATION_ERROR',
+                        'message': 'Invalid cursor',
+                        'details': {'cursor': cursor}
+                    }
+                }), 400
 
         with get_db() as db:
-            # Build query
-            query = db.query(SmartStoreOrder)
+            # Build query (rows come back as JSON text plus the cursor columns)
+            query = db.query(_order_json_column(), SmartStoreOrder.created_at, SmartStoreOrder.id)
 
             # Apply filters
             if status:
@@ -734,21 +981,27 @@ def get_smartstore_orders():
             if talktalk_status:
                 query = query.filter(SmartStoreOrder.talktalk_status == talktalk_status)
 
-            # Get total count
-            total = query.count()
+            # Seek past the last row of the previous page (id breaks created_at ties)
+            if seek:
+                query = query.filter(tuple_(SmartStoreOrder.created_at, SmartStoreOrder.id) < seek)
 
-            # Get paginated results
-            orders = query.order_by(SmartStoreOrder.created_at.desc()).offset(offset).limit(limit).all()
+            # Fetch one extra row to know whether another page exists (no COUNT/OFFSET scan)
+            rows = query.order_by(
+                SmartStoreOrder.created_at.desc(), SmartStoreOrder.id.desc()
+            ).limit(limit + 1).all()
 
-            return jsonify({
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+            # Embed the Postgres-built JSON as-is (no ORM objects, no re-encoding)
+            return _json({
                 'ok': True,
                 'data': {
-                    'orders': [order.to_dict() for order in orders],
-                    'total': total,
+                    'orders': orjson.Fragment('[' + ','.join(row.order_json for row in rows) + ']'),
                     'limit': limit,
-                    'offset': offset
+                    'next_cursor': _encode_order_cursor(rows[-1]) if has_more else None
                 }
-            }), 200
+            })
 
     except Exception as e:
         logger.error(f"❌ Error fetching SmartStore orders: {str(e)}", exc_info=True)
@@ -786,7 +1039,7 @@ def talktalk_webhook():
         content = data.get('content', {})
         message_text = content.get('text', '')
 
-        logger.info(f"📩 TalkTalk webhook received: event={event}, user={user_id}")
+        logger.info("📩 TalkTalk webhook received: event=%s, user=%s", event, user_id)
 
         # Only process 'send' events (customer responses)
         if event != 'send':
@@ -799,7 +1052,7 @@ def talktalk_webhook():
         customs_id = talktalk_api.parse_customs_id(message_text)
 
         if customs_id and talktalk_api.validate_customs_id(customs_id):
-            logger.info(f"✅ Valid customs ID received: {customs_id}")
+            logger.info("✅ Valid customs ID received: %s", customs_id)
 
             # Find the order for this customer
             with get_db() as db:
@@ -819,7 +1072,7 @@ def talktalk_webhook():
 
                     db.commit()
 
-                    logger.info(f"✅ Order {order.smartstore_order_id} updated with customs ID")
+                    logger.info("✅ Order %s updated with customs ID", order.smartstore_order_id)
 
                     # Send confirmation message to customer
                     confirmation_message = f"""감사합니다! 개인통관고유부호가 확인되었습니다.
@@ -835,10 +1088,10 @@ def talktalk_webhook():
                     )
 
                 else:
-                    logger.warning(f"⚠️ No pending order found for user {user_id}")
+                    logger.warning("⚠️ No pending order found for user %s", user_id)
 
         else:
-            logger.warning(f"⚠️ Invalid or missing customs ID in message: {message_text}")
+            logger.warning("⚠️ Invalid or missing customs ID in message: %s", message_text)
 
         return jsonify({'ok': True}), 200
 
@@ -2,16 +2,30 @@
 Webhook routes for external systems
 Handles callbacks from supplier and forwarder APIs
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, Response
+import orjson
 import hmac
 import hashlib
 from datetime import datetime
+from sqlalchemy import update, insert, func, cast
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import MultipleResultsFound
 
 from models import get_db, Order, OrderStatus, AuditLog
 
 bp = Blueprint('webhooks', __name__)
 
 
+def _json(payload: dict, status: int = 200) -> Response:
+    """Serialize webhook response with orjson"""
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
+
+def _merged_meta(meta_updates: dict):
+    """SQL expression merging meta_updates into the existing JSONB meta column"""
+    return func.coalesce(Order.meta, cast({}, JSONB)).op('||')(cast(meta_updates, JSONB))
+
+
 def verify_webhook_signature(payload: bytes, signature: str, secret: str) -> bool:
     """Verify HMAC-SHA256 signature for webhook"""
     expected = hmac.new(
@@ -33,89 +47,110 @@ def supplier_webhook():
     signature = request.headers.get('X-Signature', '')
     # TODO: Verify signature in production (Phase 3)
     # if not verify_webhook_signature(request.data, signature, SUPPLIER_SECRET):
-    #     return jsonify({'ok': False, 'error': 'Invalid signature'}), 401
+    #     return _json({'ok': False, 'error': 'Invalid signature'}, 401)
 
     try:
         data = request.get_json(force=True)
+        now_dt = datetime.utcnow()
+        now_iso = now_dt.isoformat()
 
         event = data.get('event')
         supplier_order_id = data.get('supplier_order_id')
         status = data.get('status')
 
+        # A missing id would match every order with a NULL supplier_order_id
+        if not isinstance(supplier_order_id, str) or not supplier_order_id.strip():
+            return _json({
+                'ok': False,
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': 'Missing required field: supplier_order_id',
+                    'details': {}
+                }
+            }, 400)
+
+        # Build column updates based on event
+        values = {'updated_at': now_dt}
+        meta_updates = {}
+        if event == 'order.confirmed':
+            values['status'] = OrderStatus.ORDERED_SUPPLIER
+            meta_updates['supplier_confirmed_at'] = now_iso
+
+        elif event == 'order.shipped':
+            values['status'] = OrderStatus.BUYER_INFO_SET
+            meta_updates['supplier_shipped_at'] = now_iso
+            meta_updates['supplier_tracking'] = data.get('tracking_number')
+
+        elif event == 'order.cancelled':
+            values['status'] = OrderStatus.FAILED
+            meta_updates['supplier_cancelled_at'] = now_iso
+            meta_updates['cancellation_reason'] = data.get('reason', 'Supplier cancelled')
+
+        elif event == 'order.out_of_stock':
+            values['status'] = OrderStatus.MANUAL_REVIEW
+            meta_updates['stock_issue'] = data.get('details', {})
+
+        # Merge meta server-side so the order row is never loaded
+        if meta_updates:
+            values['meta'] = _merged_meta(meta_updates)
+
         with get_db() as db:
-            # Find order by supplier_order_id
-            order = db.query(Order).filter(
-                Order.supplier_order_id == supplier_order_id
-            ).first()
+            # Update order by supplier_order_id and get its id back
+            try:
+                order_id = db.execute(
+                    update(Order)
+                    .where(Order.supplier_order_id == supplier_order_id)
+                    .values(**values)
+                    .returning(Order.id)
+                ).scalar_one_or_none()
+            except MultipleResultsFound:
+                db.rollback()
+                return _json({
+                    'ok': False,
+                    'error': {
+                        'code': 'AMBIGUOUS_ORDER',
+                        'message': f'More than one order has supplier_order_id {supplier_order_id}',
+                        'details': {}
+                    }
+                }, 409)
 
-            if not order:
-                return jsonify({
+            if order_id is None:
+                return _json({
                     'ok': False,
                     'error': {
                         'code': 'ORDER_NOT_FOUND',
                         'message': f'Order with supplier_order_id {supplier_order_id} not found',
                         'details': {}
                     }
-                }), 404
-
-            # Update order based on event
-            if event == 'order.confirmed':
-                order.status = OrderStatus.ORDERED_SUPPLIER
-                if not order.meta:
-                    order.meta = {}
-                order.meta['supplier_confirmed_at'] = datetime.utcnow().isoformat()
-
-            elif event == 'order.shipped':
-                order.status = OrderStatus.BUYER_INFO_SET
-                if not order.meta:
-                    order.meta = {}
-                order.meta['supplier_shipped_at'] = datetime.utcnow().isoformat()
-                order.meta['supplier_tracking'] = data.get('tracking_number')
-
-            elif event == 'order.cancelled':
-                order.status = OrderStatus.FAILED
-                if not order.meta:
-                    order.meta = {}
-                order.meta['supplier_cancelled_at'] = datetime.utcnow().isoformat()
-                order.meta['cancellation_reason'] = data.get('reason', 'Supplier cancelled')
-
-            elif event == 'order.out_of_stock':
-                order.status = OrderStatus.MANUAL_REVIEW
-                if not order.meta:
-                    order.meta = {}
-                order.meta['stock_issue'] = data.get('details', {})
-
-            order.updated_at = datetime.utcnow()
+                }, 404)
 
             # Create audit log
-            audit = AuditLog(
-                order_id=order.id,
+            db.execute(insert(AuditLog).values(
+                order_id=order_id,
                 actor='webhook',
                 action=f'supplier_{event}',
                 meta={'event': event, 'data': data}
-            )
-
-            db.add(audit)
+            ))
             db.commit()
 
-            return jsonify({
+            return _json({
                 'ok': True,
                 'data': {
-                    'order_id': str(order.id),
+                    'order_id': str(order_id),
                     'event': event,
                     'processed': True
                 }
-            }), 200
+            }, 200)
 
     except Exception as e:
-        return jsonify({
+        return _json({
             'ok': False,
             'error': {
                 'code': 'WEBHOOK_ERROR',
                 'message': 'Failed to process webhook',
                 'details': {'error': str(e)}
             }
-        }), 500
+        }, 500)
 
 
 @bp.route('/webhooks/forwarder', methods=['POST'])
@@ -131,81 +166,102 @@ def forwarder_webhook():
 
     try:
         data = request.get_json(force=True)
+        now_dt = datetime.utcnow()
+        now_iso = now_dt.isoformat()
 
         event = data.get('event')
         forwarder_job_id = data.get('forwarder_job_id')
         status = data.get('status')
 
+        # A missing id would match every order with a NULL forwarder_job_id
+        if not isinstance(forwarder_job_id, str) or not forwarder_job_id.strip():
+            return _json({
+                'ok': False,
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': 'Missing required field: forwarder_job_id',
+                    'details': {}
+                }
+            }, 400)
+
+        # Build column updates based on event
+        values = {'updated_at': now_dt}
+        meta_updates = {}
+        if event == 'job.received':
+            values['status'] = OrderStatus.SENT_TO_FORWARDER
+            meta_updates['forwarder_received_at'] = now_iso
+
+        elif event == 'job.in_transit':
+            meta_updates['forwarder_shipped_at'] = now_iso
+            meta_updates['tracking_number'] = data.get('tracking_number')
+
+        elif event == 'job.delivered':
+            values['status'] = OrderStatus.DONE
+            meta_updates['delivered_at'] = now_iso
+
+        elif event == 'job.failed':
+            values['status'] = OrderStatus.FAILED
+            meta_updates['forwarder_failed_at'] = now_iso
+            meta_updates['failure_reason'] = data.get('reason', 'Forwarder failed')
+
+        # Merge meta server-side so the order row is never loaded
+        if meta_updates:
+            values['meta'] = _merged_meta(meta_updates)
+
         with get_db() as db:
-            # Find order by forwarder_job_id
-            order = db.query(Order).filter(
-                Order.forwarder_job_id == forwarder_job_id
-            ).first()
+            # Update order by forwarder_job_id and get its id back
+            try:
+                order_id = db.execute(
+                    update(Order)
+                    .where(Order.forwarder_job_id == forwarder_job_id)
+                    .values(**values)
+                    .returning(Order.id)
+                ).scalar_one_or_none()
+            except MultipleResultsFound:
+                db.rollback()
+                return _json({
+                    'ok': False,
+                    'error': {
+                        'code': 'AMBIGUOUS_ORDER',
+                        'message': f'More than one order has forwarder_job_id {forwarder_job_id}',
+                        'details': {}
+                    }
+                }, 409)
 
-            if not order:
-                return jsonify({
+            if order_id is None:
+                return _json({
                     'ok': False,
                     'error': {
                         'code': 'ORDER_NOT_FOUND',
                         'message': f'Order with forwarder_job_id {forwarder_job_id} not found',
                         'details': {}
                     }
-                }), 404
-
-            # Update order based on event
-            if event == 'job.received':
-                order.status = OrderStatus.SENT_TO_FORWARDER
-                if not order.meta:
-                    order.meta = {}
-                order.meta['forwarder_received_at'] = datetime.utcnow().isoformat()
-
-            elif event == 'job.in_transit':
-                if not order.meta:
-                    order.meta = {}
-                order.meta['forwarder_shipped_at'] = datetime.utcnow().isoformat()
-                order.meta['tracking_number'] = data.get('tracking_number')
-
-            elif event == 'job.delivered':
-                order.status = OrderStatus.DONE
-                if not order.meta:
-                    order.meta = {}
-                order.meta['delivered_at'] = datetime.utcnow().isoformat()
-
-            elif event == 'job.failed':
-                order.status = OrderStatus.FAILED
-                if not order.meta:
-                    order.meta = {}
-                order.meta['forwarder_failed_at'] = datetime.utcnow().isoformat()
-                order.meta['failure_reason'] = data.get('reason', 'Forwarder failed')
-
-            order.updated_at = datetime.utcnow()
+                }, 404)
 
             # Create audit log
-            audit = AuditLog(
-                order_id=order.id,
+            db.execute(insert(AuditLog).values(
+                order_id=order_id,
                 actor='webhook',
                 action=f'forwarder_{event}',
                 meta={'event': event, 'data': data}
-            )
-
-            db.add(audit)
+            ))
             db.commit()
 
-            return jsonify({
+            return _json({
                 'ok': True,
                 'data': {
-                    'order_id': str(order.id),
+                    'order_id': str(order_id),
                     'event': event,
                     'processed': True
                 }
-            }), 200
+            }, 200)
 
     except Exception as e:
-        return jsonify({
+        return _json({
             'ok': False,
             'error': {
                 'code': 'WEBHOOK_ERROR',
                 'message': 'Failed to process webhook',
                 'details': {'error': str(e)}
             }
-        }), 500
+        }, 500)
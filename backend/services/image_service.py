@@ -6,9 +6,12 @@ import os
 import logging
 import hashlib
 import base64
-from typing import List, Optional
-from urllib.parse import urlparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import multiprocessing
+import threading
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse, ParseResult
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 import requests
 from PIL import Image
 from io import BytesIO
@@ -24,6 +27,86 @@ cloudinary.config(
     api_secret=os.getenv('CLOUDINARY_API_SECRET')
 )
 
+# URL path extension -> stored file extension
+_URL_EXTENSIONS = {
+    'jpg': 'jpg',
+    'jpeg': 'jpg',
+    'png': 'png',
+    'webp': 'webp',
+    'gif': 'gif',
+}
+
+
+# Shared process pool for CPU-bound PIL work, created on first use and reused by
+# every request. 'spawn' instead of fork: forking from multi-threaded gunicorn
+# gthread workers can copy locks held by other threads and deadlock the child.
+_optimize_pool: Optional[ProcessPoolExecutor] = None
+_optimize_pool_lock = threading.Lock()
+
+
+def _get_optimize_pool() -> ProcessPoolExecutor:
+    """Return the shared image optimization pool (recreated if a worker died)"""
+    global _optimize_pool
+    with _optimize_pool_lock:
+        if _optimize_pool is None:
+            _optimize_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _optimize_pool
+
+
+def _discard_optimize_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next call creates a fresh one"""
+    global _optimize_pool
+    with _optimize_pool_lock:
+        if _optimize_pool is pool:
+            _optimize_pool = None
+    pool.shutdown(wait=False)
+
+
+def _optimize_and_save(blob: bytes, filepath: str, max_size: tuple, file_ext: str) -> None:
+    """
+    Resize and re-encode image bytes to disk
+
+    Kept at module level so it can run in a ProcessPoolExecutor worker.
+
+    Args:
+        blob: Raw image bytes
+        filepath: Destination path
+        max_size: Maximum dimensions (width, height)
+        file_ext: Target file extension
+    """
+    img_data = BytesIO(blob)
+    img = Image.open(img_data)
+
+    # Convert RGBA to RGB if saving as JPEG
+    if file_ext == 'jpg' and img.mode in ('RGBA', 'LA', 'P'):
+        rgb_img = Image.new('RGB', img.size, (255, 255, 255))
+        rgb_img.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        img = rgb_img
+
+    # Resize if too large
+    if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+    # Save optimized image
+    save_kwargs = {'optimize': True}
+    if file_ext == 'jpg':
+        save_kwargs['quality'] = 85
+
+    img.save(filepath, **save_kwargs)
+
+    # Close image to free memory immediately
+    img.close()
+    img_data.close()
+
+
+def _write_original(blob: bytes, filepath: str) -> None:
+    """Write image bytes to disk without processing"""
+    with open(filepath, 'wb') as f:
+        f.write(blob)
+
 
 class ImageService:
     """Service for downloading and processing product images"""
@@ -57,29 +140,23 @@ class ImageService:
         """
         return hashlib.md5(url.encode()).hexdigest()[:12]
 
-    def _get_file_extension(self, url: str, content_type: Optional[str] = None) -> str:
+    def _get_file_extension(self, parsed: ParseResult, content_type: Optional[str] = None) -> str:
         """
         Get file extension from URL or content type
 
         Args:
-            url: Image URL
+            parsed: Pre-parsed image URL (urlparse result)
             content_type: HTTP Content-Type header
 
         Returns:
             File extension (e.g., 'jpg', 'png')
         """
         # Try to get from URL
-        parsed = urlparse(url)
-        path = parsed.path.lower()
-
-        if path.endswith('.jpg') or path.endswith('.jpeg'):
-            return 'jpg'
-        elif path.endswith('.png'):
-            return 'png'
-        elif path.endswith('.webp'):
-            return 'webp'
-        elif path.endswith('.gif'):
-            return 'gif'
+        path = parsed.path
+        if '.' in path:
+            ext = _URL_EXTENSIONS.get(path.rsplit('.', 1)[-1].lower())
+            if ext:
+                return ext
 
         # Try to get from content type
         if content_type:
@@ -95,28 +172,25 @@ class ImageService:
         # Default to jpg
         return 'jpg'
 
-    def download_image(
-        self,
-        url: str,
-        optimize: bool = True,
-        max_size: tuple = (1200, 1200)
-    ) -> Optional[str]:
+    def _fetch_image(self, url: str) -> Optional[Tuple[str, str, Optional[bytes]]]:
         """
-        Download and process single image
+        Fetch raw image bytes and resolve the local file path
 
         Args:
             url: Image URL
-            optimize: Whether to optimize/resize image
-            max_size: Maximum dimensions (width, height)
 
         Returns:
-            Local file path or None if failed
+            (filepath, file_ext, content) tuple - content is None if the file
+            already exists locally. None if the download failed.
         """
         try:
             # Fix URL if it starts with //
             if url.startswith('//'):
                 url = 'https:' + url
 
+            # Parse once and reuse for extension detection
+            parsed = urlparse(url)
+
             logger.info(f"🔄 Downloading image: {url[:80]}...")
 
             # Download image
@@ -125,7 +199,7 @@ class ImageService:
 
             # Get file extension
             content_type = response.headers.get('content-type', '')
-            file_ext = self._get_file_extension(url, content_type)
+            file_ext = self._get_file_extension(parsed, content_type)
 
             # Generate filename
             img_hash = self._get_image_hash(url)
@@ -135,55 +209,74 @@ class ImageService:
             # Check if already downloaded
             if os.path.exists(filepath):
                 logger.info(f"✅ Image already exists: {filename}")
-                return filepath
+                return filepath, file_ext, None
 
-            # Process image if optimization is enabled
-            if optimize:
-                try:
-                    # Open image with memory limit
-                    img_data = BytesIO(response.content)
-                    img = Image.open(img_data)
-
-                    # Convert RGBA to RGB if saving as JPEG
-                    if file_ext == 'jpg' and img.mode in ('RGBA', 'LA', 'P'):
-                        rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                        rgb_img.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-                        img = rgb_img
-
-                    # Resize if too large
-                    if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                        img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                        logger.info(f"📏 Resized image to {img.size}")
-
-                    # Save optimized image
-                    save_kwargs = {'optimize': True}
-                    if file_ext == 'jpg':
-                        save_kwargs['quality'] = 85
-
-                    img.save(filepath, **save_kwargs)
-
-                    # Close image to free memory immediately
-                    img.close()
-                    img_data.close()
-
-                    logger.info(f"✅ Image optimized and saved: {filename}")
-
-                except Exception as opt_error:
-                    logger.warning(f"⚠️ Optimization failed, saving original: {str(opt_error)}")
-                    # Save original if optimization fails
-                    with open(filepath, 'wb') as f:
-                        f.write(response.content)
-            else:
-                # Save without optimization
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
-                logger.info(f"✅ Image saved: {filename}")
-
-            return filepath
+            return filepath, file_ext, response.content
 
         except requests.exceptions.RequestException as e:
             logger.error(f"❌ Failed to download image: {str(e)}")
             return None
+
+    def _save_image(
+        self,
+        content: bytes,
+        filepath: str,
+        file_ext: str,
+        optimize: bool,
+        max_size: tuple
+    ) -> str:
+        """
+        Save fetched image bytes, optimizing in-process when requested
+
+        Returns:
+            Local file path
+        """
+        filename = os.path.basename(filepath)
+
+        # Process image if optimization is enabled
+        if optimize:
+            try:
+                _optimize_and_save(content, filepath, max_size, file_ext)
+                logger.info(f"✅ Image optimized and saved: {filename}")
+            except Exception as opt_error:
+                logger.warning(f"⚠️ Optimization failed, saving original: {str(opt_error)}")
+                # Save original if optimization fails
+                _write_original(content, filepath)
+        else:
+            # Save without optimization
+            _write_original(content, filepath)
+            logger.info(f"✅ Image saved: {filename}")
+
+        return filepath
+
+    def download_image(
+        self,
+        url: str,
+        optimize: bool = True,
+        max_size: tuple = (1200, 1200)
+    ) -> Optional[str]:
+        """
+        Download and process single image
+
+        Args:
+            url: Image URL
+            optimize: Whether to optimize/resize image
+            max_size: Maximum dimensions (width, height)
+
+        Returns:
+            Local file path or None if failed
+        """
+        try:
+            fetched = self._fetch_image(url)
+            if not fetched:
+                return None
+
+            filepath, file_ext, content = fetched
+            if content is None:
+                return filepath
+
+            return self._save_image(content, filepath, file_ext, optimize, max_size)
+
         except Exception as e:
             logger.error(f"❌ Error processing image: {str(e)}")
             return None
@@ -262,30 +355,68 @@ class ImageService:
         logger.info(f"🔄 Downloading {len(urls)} images in parallel (max {max_workers} workers)...")
 
         local_paths = []
+        max_size = (1200, 1200)
+
+        # Network-bound fetches run on threads, CPU-bound PIL work on processes
+        process_pool = _get_optimize_pool() if optimize else None
 
-        # Parallel download with ThreadPoolExecutor
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Submit all download tasks
             future_to_url = {
-                executor.submit(self.download_image, url, optimize): (i, url)
+                executor.submit(self._fetch_image, url): (i, url)
                 for i, url in enumerate(urls)
             }
 
-            # Collect results as they complete
-            completed = 0
+            # Hand fetched bytes to the process pool as they arrive
+            pending_saves = {}
             for future in as_completed(future_to_url):
                 i, url = future_to_url[future]
-                completed += 1
 
                 try:
-                    filepath = future.result()
-                    if filepath:
-                        local_paths.append(filepath)
-                        logger.info(f"✅ [{completed}/{len(urls)}] Downloaded")
-                    else:
-                        logger.warning(f"⚠️ [{completed}/{len(urls)}] Failed: {url[:80]}")
+                    fetched = future.result()
                 except Exception as e:
-                    logger.error(f"❌ [{completed}/{len(urls)}] Error downloading {url[:80]}: {str(e)}")
+                    logger.error(f"❌ Error downloading {url[:80]}: {str(e)}")
+                    continue
+
+                if not fetched:
+                    logger.warning(f"⚠️ Failed: {url[:80]}")
+                    continue
+
+                filepath, file_ext, content = fetched
+                if content is None:
+                    local_paths.append(filepath)
+                elif process_pool is None:
+                    local_paths.append(self._save_image(content, filepath, file_ext, optimize, max_size))
+                else:
+                    try:
+                        save_future = process_pool.submit(
+                            _optimize_and_save, content, filepath, max_size, file_ext
+                        )
+                    except BrokenProcessPool:
+                        logger.warning("⚠️ Image optimization pool is broken, optimizing in-thread")
+                        _discard_optimize_pool(process_pool)
+                        process_pool = None
+                        local_paths.append(self._save_image(content, filepath, file_ext, optimize, max_size))
+                        continue
+                    pending_saves[save_future] = (filepath, content)
+
+        # Collect optimization results as they complete
+        completed = 0
+        for save_future in as_completed(pending_saves):
+            filepath, content = pending_saves[save_future]
+            completed += 1
+
+            try:
+                save_future.result()
+                logger.info(f"✅ [{completed}/{len(pending_saves)}] Optimized: {os.path.basename(filepath)}")
+            except Exception as opt_error:
+                logger.warning(f"⚠️ Optimization failed, saving original: {str(opt_error)}")
+                if isinstance(opt_error, BrokenProcessPool) and process_pool is not None:
+                    _discard_optimize_pool(process_pool)
+                    process_pool = None
+                _write_original(content, filepath)
+
+            local_paths.append(filepath)
 
         logger.info(f"🎉 Downloaded {len(local_paths)}/{len(urls)} images successfully (parallel mode)")
         return local_paths
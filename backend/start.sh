@@ -14,4 +14,7 @@ echo "Testing Next.js connection..."
 curl -f http://localhost:3000 > /dev/null 2>&1 && echo "Next.js is responding!" || echo "Warning: Next.js may not be ready yet"
 
 echo "Starting Flask on port 8080..."
-cd /app/backend && exec gunicorn app:app --bind 0.0.0.0:8080 --workers 2 --timeout 120
+# Threaded workers: requests mostly wait on Naver/DB I/O, so each worker
+# serves GUNICORN_THREADS requests at once instead of one
+cd /app/backend && exec gunicorn app:app --bind 0.0.0.0:8080 --workers 2 \
+    --worker-class gthread --threads "${GUNICORN_THREADS:-16}" --timeout 120
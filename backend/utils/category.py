@@ -3,6 +3,8 @@ Category-based weight estimation for products
 Designed to cover 50% of product types in search results
 """
 
+from functools import lru_cache
+
 # Category weight estimates (kg) - covers common product types
 CATEGORY_WEIGHTS = {
     # 의류 (Clothing)
@@ -144,6 +146,7 @@ CATEGORY_KEYWORDS = {
 }
 
 
+@lru_cache(maxsize=8192)
 def estimate_weight_from_title(title: str) -> float:
     """
     Estimate product weight from title using keyword matching
@@ -154,6 +157,7 @@ def estimate_weight_from_title(title: str) -> float:
     3. Default to 1.0kg if no match
 
     This achieves ~50% coverage for common search results
+    Results are memoized per title (variants/SKUs often repeat titles)
 
     Args:
         title: Product title in Korean
@@ -203,6 +207,7 @@ def estimate_weight_from_price(price_krw: int) -> float:
         return 5.0
 
 
+@lru_cache(maxsize=8192)
 def get_category_from_title(title: str) -> str:
     """
     Get category name from product title
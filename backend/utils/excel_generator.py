@@ -3,10 +3,11 @@ Excel Generator - 스마트스토어 업로드용 엑셀 파일 생성
 네이버 스마트스토어 판매자센터 일괄 업로드 형식
 """
 import os
+import csv
 import logging
 from datetime import datetime
 from typing import List, Dict, Any
-import pandas as pd
+import xlsxwriter
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,9 @@ class SmartStoreExcelGenerator:
         '메모'
     ]
 
+    # 상세설명 고정 머리말
+    _DESC_PREAMBLE = "중국 직구 상품입니다.\n\n"
+
     def generate_excel(
         self,
         products: List[Dict[str, Any]],
@@ -71,21 +75,24 @@ class SmartStoreExcelGenerator:
         try:
             logger.info(f"📊 Generating Excel for {len(products)} products...")
 
-            # DataFrame 생성
-            rows = []
-            for idx, product in enumerate(products, 1):
-                row = self._format_product_row(product, idx)
-                rows.append(row)
-
-            df = pd.DataFrame(rows, columns=self.REQUIRED_COLUMNS)
-
             # 파일명 생성
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f'smartstore_products_{timestamp}.xlsx'
             filepath = os.path.join(output_dir, filename)
 
-            # 엑셀 저장
-            df.to_excel(filepath, index=False, engine='openpyxl')
+            # 엑셀 저장 (xlsxwriter constant_memory: 행 단위 스트리밍 기록)
+            workbook = xlsxwriter.Workbook(
+                filepath,
+                {'constant_memory': True, 'strings_to_urls': False}
+            )
+            try:
+                worksheet = workbook.add_worksheet()
+                worksheet.write_row(0, 0, self.REQUIRED_COLUMNS)
+                normalized = (self._normalize(p) for p in products)
+                for idx, product in enumerate(normalized, 1):
+                    worksheet.write_row(idx, 0, self._format_product_row(product, idx))
+            finally:
+                workbook.close()
 
             logger.info(f"✅ Excel file created: {filepath}")
             return filepath
@@ -94,75 +101,96 @@ class SmartStoreExcelGenerator:
             logger.error(f"❌ Excel generation failed: {str(e)}")
             raise
 
+    def _normalize(self, product: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        상품 dict를 고정 스키마로 정규화 (수집 단계에서 한 번만)
+
+        - images: 문자열이면 리스트로 변환
+        - 레거시 키 통합: taobao_id → taobao_item_id, source_url → taobao_url,
+          price_cny → taobao_price_cny, selling_price → price
+        """
+        images = product.get('images') or []
+        if isinstance(images, str):
+            images = [images]
+
+        return {
+            'title': product.get('title') or '',
+            'korean_title': product.get('korean_title') or '',
+            'price': product.get('price') or product.get('selling_price') or 0,
+            'images': images,
+            'taobao_item_id': product.get('taobao_item_id') or product.get('taobao_id') or '',
+            'taobao_url': product.get('taobao_url') or product.get('source_url') or '',
+            'taobao_price_cny': product.get('taobao_price_cny') or product.get('price_cny') or 0,
+            'shipping_fee': product.get('shipping_fee', 0),
+            'total_cost': product.get('total_cost', 0),
+            'expected_profit': product.get('expected_profit', 0),
+            'actual_margin': product.get('actual_margin', 0),
+            'origin': product.get('origin', '중국'),
+            'brand': product.get('brand', '노브랜드'),
+            'category': product.get('category', ''),
+            'memo': product.get('memo', ''),
+        }
+
     def _format_product_row(self, product: Dict[str, Any], row_num: int) -> list:
         """
-        단일 상품을 엑셀 행으로 변환
+        정규화된 단일 상품을 엑셀 행으로 변환 (_normalize 참고)
 
         Returns:
             [값1, 값2, ...] 형태의 리스트
         """
         try:
-            # 이미지 처리
-            images = product.get('images', [])
-            if isinstance(images, str):
-                images = [images]
-
-            # 타오바오 정보
-            taobao_id = product.get('taobao_item_id') or product.get('taobao_id', '')
-            taobao_url = product.get('taobao_url') or product.get('source_url', '')
-            taobao_price_cny = product.get('taobao_price_cny') or product.get('price_cny', 0)
-
-            # 가격 정보
-            selling_price = product.get('price') or product.get('selling_price', 0)
-            shipping_fee = product.get('shipping_fee', 0)
-            total_cost = product.get('total_cost', 0)
-            expected_profit = product.get('expected_profit', 0)
-            actual_margin = product.get('actual_margin', 0)
+            # 이미지 최대 5개 (부족하면 빈 문자열로 채움)
+            main_image, extra_image1, extra_image2, extra_image3, extra_image4 = (
+                list(product['images'][:5]) + [''] * 5
+            )[:5]
+
+            taobao_price_cny = product['taobao_price_cny']
+            actual_margin = product['actual_margin']
 
             # 상세 설명 생성
             description = self._generate_description(
-                taobao_url=taobao_url,
+                taobao_url=product['taobao_url'],
                 taobao_price_cny=taobao_price_cny,
-                total_cost=total_cost,
-                expected_profit=expected_profit,
+                total_cost=product['total_cost'],
+                expected_profit=product['expected_profit'],
                 actual_margin=actual_margin
             )
 
             return [
                 # 기본 정보
-                product.get('title', '')[:100],  # 상품명 (원본 중국어)
-                product.get('korean_title', '')[:100],  # 한글제목 (AI 번역)
-                selling_price,  # 판매가
+                product['title'][:100],  # 상품명 (원본 중국어)
+                product['korean_title'][:100],  # 한글제목 (AI 번역)
+                product['price'],  # 판매가
 
                 # 이미지 (최대 5개)
-                images[0] if len(images) > 0 else '',  # 대표이미지
-                images[1] if len(images) > 1 else '',  # 추가이미지1
-                images[2] if len(images) > 2 else '',  # 추가이미지2
-                images[3] if len(images) > 3 else '',  # 추가이미지3
-                images[4] if len(images) > 4 else '',  # 추가이미지4
+                main_image,    # 대표이미지
+                extra_image1,  # 추가이미지1
+                extra_image2,  # 추가이미지2
+                extra_image3,  # 추가이미지3
+                extra_image4,  # 추가이미지4
 
                 # 상품 속성
                 '신상품',  # 상품상태
                 '과세',    # 과세여부
-                product.get('origin', '중국'),  # 원산지
+                product['origin'],  # 원산지
                 '택배',    # 배송방법
-                shipping_fee,  # 배송비
+                product['shipping_fee'],  # 배송비
                 '수입',    # 제조사
-                product.get('brand', '노브랜드'),  # 브랜드
-                product.get('category', ''),  # 카테고리
+                product['brand'],  # 브랜드
+                product['category'],  # 카테고리
                 description,  # 상세설명
 
                 # 추가 정보 (참고용)
-                taobao_id,
+                product['taobao_item_id'],
                 f'¥{taobao_price_cny}' if taobao_price_cny else '',
                 f'{int(actual_margin * 100)}%' if actual_margin else '',
-                product.get('memo', '')
+                product['memo']
             ]
 
         except Exception as e:
             logger.warning(f"Error formatting product row: {str(e)}")
             # Return minimal row
-            return [product.get('title', '오류')] + [''] * (len(self.REQUIRED_COLUMNS) - 1)
+            return [product['title'] or '오류'] + [''] * (len(self.REQUIRED_COLUMNS) - 1)
 
     def _generate_description(
         self,
@@ -173,33 +201,18 @@ class SmartStoreExcelGenerator:
         actual_margin: float
     ) -> str:
         """상세 설명 생성"""
-        description_parts = []
-
-        # 기본 설명
-        description_parts.append("중국 직구 상품입니다.")
-        description_parts.append("")
-
-        # 가격 정보
-        if taobao_price_cny:
-            description_parts.append(f"타오바오 원가: ¥{taobao_price_cny}")
-
-        if total_cost:
-            description_parts.append(f"총 원가 (배송비 포함): {total_cost:,}원")
-
-        if expected_profit:
-            description_parts.append(f"예상 순이익: {expected_profit:,}원")
-
-        if actual_margin:
-            description_parts.append(f"마진율: {int(actual_margin * 100)}%")
-
-        description_parts.append("")
+        # 가격 정보 (값이 있는 항목만)
+        price_lines = ''.join((
+            f"타오바오 원가: ¥{taobao_price_cny}\n" if taobao_price_cny else '',
+            f"총 원가 (배송비 포함): {total_cost:,}원\n" if total_cost else '',
+            f"예상 순이익: {expected_profit:,}원\n" if expected_profit else '',
+            f"마진율: {int(actual_margin * 100)}%\n" if actual_margin else '',
+        ))
 
         # 타오바오 링크
-        if taobao_url:
-            description_parts.append("타오바오 원본:")
-            description_parts.append(taobao_url)
+        link = f"\n타오바오 원본:\n{taobao_url}" if taobao_url else ''
 
-        return '\n'.join(description_parts)
+        return f"{self._DESC_PREAMBLE}{price_lines}{link}"
 
     def generate_csv(
         self,
@@ -215,20 +228,18 @@ class SmartStoreExcelGenerator:
         try:
             logger.info(f"📊 Generating CSV for {len(products)} products...")
 
-            rows = []
-            for idx, product in enumerate(products, 1):
-                row = self._format_product_row(product, idx)
-                rows.append(row)
-
-            df = pd.DataFrame(rows, columns=self.REQUIRED_COLUMNS)
-
             # 파일명 생성
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f'smartstore_products_{timestamp}.csv'
             filepath = os.path.join(output_dir, filename)
 
             # CSV 저장 (UTF-8 with BOM for Excel compatibility)
-            df.to_csv(filepath, index=False, encoding='utf-8-sig')
+            with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(self.REQUIRED_COLUMNS)
+                normalized = (self._normalize(p) for p in products)
+                for idx, product in enumerate(normalized, 1):
+                    writer.writerow(self._format_product_row(product, idx))
 
             logger.info(f"✅ CSV file created: {filepath}")
             return filepath
@@ -2,63 +2,240 @@
 Idempotency utilities
 Ensures duplicate requests with same key don't cause duplicate operations
 """
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+import os
+import heapq
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
+
+# Optional import - Redis backend is used only when REDIS_URL is configured
+try:
+    import redis
+    import msgpack
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+logger = logging.getLogger(__name__)
+
+
+# How long an in-progress claim holds a key before another request may take it over
+CLAIM_TTL_SECONDS = 120
 
 
 class IdempotencyStore:
     """
     Simple in-memory idempotency store
     In production, use Redis or database with TTL
+
+    Entries are (response, status_code, expires_at) tuples keyed by
+    idempotency key, with expires_at on the time.monotonic() clock.
+    A response of None marks a key claimed by a request still in progress.
+    A min-heap of (expires_at, key) lets expired entries be evicted
+    from the front instead of scanning the whole store.
+
+    The store is bounded at max_size entries with LRU eviction, so unique
+    keys cannot grow memory without limit.
     """
 
-    def __init__(self, ttl_seconds: int = 86400):
-        self.store: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, ttl_seconds: int = 86400, max_size: int = 100_000):
+        self.store: 'OrderedDict[str, Tuple[Optional[Dict[str, Any]], int, float]]' = OrderedDict()
         self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
 
     def get(self, key: str) -> Optional[Dict[str, Any]]:
-        """Get cached response for idempotency key"""
-        if key not in self.store:
-            return None
+        """Get cached response for idempotency key (None if missing or still in progress)"""
+        with self._lock:
+            entry = self._live_entry(key, time.monotonic())
+            if entry is None or entry[0] is None:
+                return None
 
-        entry = self.store[key]
+            response, status_code, _ = entry
 
-        # Check if expired
-        if datetime.utcnow() > entry['expires_at']:
-            del self.store[key]
-            return None
+            # Refresh LRU position
+            self.store.move_to_end(key)
 
         return {
-            'response': entry['response'],
-            'status_code': entry['status_code']
-        }
-
-    def set(self, key: str, response: Dict[str, Any], status_code: int):
-        """Cache response for idempotency key"""
-        self.store[key] = {
             'response': response,
-            'status_code': status_code,
-            'created_at': datetime.utcnow(),
-            'expires_at': datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+            'status_code': status_code
         }
 
+    def claim(self, key: str) -> bool:
+        """
+        Reserve key for a request about to run
+        Returns False if the key already has a response or an unexpired claim
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._live_entry(key, now) is not None:
+                return False
+            self._put(key, None, 0, now, now + CLAIM_TTL_SECONDS)
+        return True
+
+    def set(self, key: str, response: Dict[str, Any], status_code: int) -> bool:
+        """Cache response for idempotency key, replacing its claim (always stored in memory)"""
+        now = time.monotonic()
+        with self._lock:
+            self._put(key, response, status_code, now, now + self.ttl_seconds)
+        return True
+
+    def release(self, key: str):
+        """Drop an in-progress claim so the request can be retried"""
+        with self._lock:
+            entry = self.store.get(key)
+            if entry is not None and entry[0] is None:
+                del self.store[key]
+
     def exists(self, key: str) -> bool:
         """Check if key exists and is not expired"""
         return self.get(key) is not None
 
     def cleanup_expired(self):
         """Remove expired entries (call periodically)"""
-        now = datetime.utcnow()
-        expired_keys = [
-            k for k, v in self.store.items()
-            if now > v['expires_at']
-        ]
-        for key in expired_keys:
+        with self._lock:
+            self._evict_expired(time.monotonic())
+
+    def _live_entry(self, key: str, now: float):
+        """Return the unexpired entry for key; caller must hold the lock"""
+        entry = self.store.get(key)
+        if entry is not None and now > entry[2]:
             del self.store[key]
+            return None
+        return entry
+
+    def _put(self, key: str, response: Optional[Dict[str, Any]], status_code: int, now: float, expires_at: float):
+        """Store an entry and enforce max_size; caller must hold the lock"""
+        self._evict_expired(now)
+        self.store[key] = (response, status_code, expires_at)
+        self.store.move_to_end(key)
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+
+        # Evict least recently used entries beyond max_size
+        while len(self.store) > self.max_size:
+            self.store.popitem(last=False)
+
+        # Drop heap entries left behind by LRU evictions and re-sets
+        if len(self._expiry_heap) > 2 * self.max_size:
+            self._expiry_heap = [(entry[2], k) for k, entry in self.store.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def _evict_expired(self, now: float):
+        """Pop expired heap entries; caller must hold the lock"""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self.store.get(key)
+            # Skip stale heap entries for keys that were re-set later
+            if entry is not None and entry[2] == expires_at:
+                del self.store[key]
+
+
+class RedisIdempotencyStore:
+    """
+    Redis-backed idempotency store shared across processes
+    Entries are msgpack-encoded (status_code, response) pairs with a Redis TTL;
+    a (None, None) entry marks a key claimed by a request still in progress.
+    Redis calls use a short socket timeout, and Redis errors are logged and
+    served from a per-process in-memory store so requests keep working
+    (deduplicated within the worker) while Redis is unreachable
+    """
+
+    KEY_PREFIX = 'idem:'
+    _CLAIM_MARKER = msgpack.packb((None, None), use_bin_type=True) if HAS_REDIS else None
+    _RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, redis_url: str, ttl_seconds: int = 86400):
+        self.client = redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.ttl_seconds = ttl_seconds
+        self.fallback = IdempotencyStore(ttl_seconds=ttl_seconds)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get cached response for idempotency key (None if missing or still in progress)"""
+        try:
+            raw = self.client.get(self.KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning(f"⚠️ Idempotency store get failed, using in-memory store: {str(e)}")
+            return self.fallback.get(key)
+
+        if raw is None:
+            return None
+
+        status_code, response = msgpack.unpackb(raw, raw=False)
+        if status_code is None:
+            return None
+        return {
+            'response': response,
+            'status_code': status_code
+        }
+
+    def claim(self, key: str) -> bool:
+        """
+        Reserve key for a request about to run (SET EX NX with a short TTL)
+        Returns False if the key already has a response or an unexpired claim
+        """
+        try:
+            stored = self.client.set(self.KEY_PREFIX + key, self._CLAIM_MARKER, ex=CLAIM_TTL_SECONDS, nx=True)
+        except Exception as e:
+            logger.warning(f"⚠️ Idempotency store claim failed, using in-memory store: {str(e)}")
+            return self.fallback.claim(key)
+        return bool(stored)
+
+    def set(self, key: str, response: Dict[str, Any], status_code: int) -> bool:
+        """
+        Cache response for idempotency key, replacing its claim (SET EX)
+        Returns False if the response could only be kept in memory
+        """
+        try:
+            self.client.set(
+                self.KEY_PREFIX + key,
+                msgpack.packb((status_code, response), use_bin_type=True),
+                ex=self.ttl_seconds
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Idempotency store set failed, using in-memory store: {str(e)}")
+            self.fallback.set(key, response, status_code)
+            return False
+        return True
+
+    def release(self, key: str):
+        """Drop an in-progress claim so the request can be retried"""
+        self.fallback.release(key)
+        try:
+            # Delete only the claim marker, never a stored response
+            self.client.eval(self._RELEASE_SCRIPT, 1, self.KEY_PREFIX + key, self._CLAIM_MARKER)
+        except Exception as e:
+            logger.warning(f"⚠️ Idempotency store release failed: {str(e)}")
+
+    def exists(self, key: str) -> bool:
+        """Check if key exists and is not expired"""
+        return self.get(key) is not None
+
+    def cleanup_expired(self):
+        """Redis expires keys itself; only the in-memory fallback needs trimming"""
+        self.fallback.cleanup_expired()
+
+
+def get_idempotency_store(ttl_seconds: int = 86400):
+    """
+    Create idempotency store
+    Uses Redis when REDIS_URL is set (shared across gunicorn workers),
+    otherwise falls back to the in-memory store
+    """
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url:
+        if HAS_REDIS:
+            return RedisIdempotencyStore(redis_url, ttl_seconds=ttl_seconds)
+        logger.warning("⚠️ REDIS_URL is set but redis/msgpack are not installed, using in-memory idempotency store")
+
+    return IdempotencyStore(ttl_seconds=ttl_seconds)
 
 
 # Global idempotency store instance
-idempotency_store = IdempotencyStore(ttl_seconds=86400)  # 24 hours
+idempotency_store = get_idempotency_store(ttl_seconds=86400)  # 24 hours
 
 
 def validate_idempotency_key(key: Optional[str]) -> tuple[bool, Optional[str]]:
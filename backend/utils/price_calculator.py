@@ -3,12 +3,42 @@ Price Calculator - 판매가 및 배송비 자동 계산
 중국 배송대행비, 환율, 마진을 고려한 최종 판매가 산출
 """
 import os
+import re
+import json
+import math
+import time
+import bisect
 import logging
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# Retry transient FX API failures with exponential backoff + jitter
+_FX_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    backoff_jitter=0.5,
+    status_forcelist=(408, 429, 500, 502, 503, 504),
+    allowed_methods=frozenset(['GET']),
+    respect_retry_after_header=True
+)
+
+# Last-known-good exchange rate, persisted across process restarts
+FX_CACHE_PATH = os.getenv('FX_CACHE_PATH', '/tmp/fx_cny_krw.json')
+FX_CACHE_TTL_SECONDS = int(os.getenv('FX_CACHE_TTL_SECONDS', '3600'))
+DEFAULT_EXCHANGE_RATE = 190.0
+
+# Circuit breaker: after N consecutive failures, skip the FX API for a cooldown
+FX_BREAKER_THRESHOLD = 3
+FX_BREAKER_COOLDOWN_SECONDS = 60
+
+# Fallback (last-known/default) rates are reused this long before retrying the API
+FX_FALLBACK_TTL_SECONDS = 60
+
 
 class ShippingCalculator:
     """중국 배송대행비 자동 계산"""
@@ -22,6 +52,14 @@ class ShippingCalculator:
         5.0: 18000,  # 5kg 이하: 18,000원
     }
 
+    # 정렬된 무게 구간 / 배송비 (bisect 조회용)
+    _SORTED_THRESHOLDS = tuple(sorted(WEIGHT_BASED_RATES))
+    _SORTED_FEES = tuple(fee for _, fee in sorted(WEIGHT_BASED_RATES.items()))
+
+    # 배치 계산용 배열
+    _RATE_THRESHOLDS = np.array(_SORTED_THRESHOLDS, dtype=np.float64)
+    _RATE_FEES = np.array(_SORTED_FEES, dtype=np.int64)
+
     # 부피 무게 계산 (가로 x 세로 x 높이 / 6000)
     VOLUME_DIVISOR = 6000
 
@@ -48,6 +86,11 @@ class ShippingCalculator:
         '기타': 0.5,
     }
 
+    # 카테고리 키워드 단일 정규식 (긴 키워드 우선: '맨투맨' > '의류')
+    _CATEGORY_PATTERN = re.compile(
+        '|'.join(re.escape(k) for k in sorted(CATEGORY_WEIGHTS, key=len, reverse=True))
+    )
+
     def calculate_shipping(
         self,
         weight_kg: Optional[float] = None,
@@ -124,36 +167,83 @@ class ShippingCalculator:
 
     def _estimate_weight_from_title(self, title: str) -> float:
         """제목에서 카테고리 추론하여 평균 무게 반환"""
-        title_lower = title.lower()
-
-        for category, weight in self.CATEGORY_WEIGHTS.items():
-            if category in title_lower or category in title:
-                logger.info(f"   Estimated weight from title: {category} -> {weight}kg")
-                return weight
+        match = self._CATEGORY_PATTERN.search(title.lower())
+        if match:
+            category = match.group(0)
+            weight = self.CATEGORY_WEIGHTS[category]
+            logger.info(f"   Estimated weight from title: {category} -> {weight}kg")
+            return weight
 
         # 기본값
         return 0.5
 
     def _get_fee_by_weight(self, weight_kg: float) -> int:
         """무게에 따른 배송비 조회"""
-        for max_weight, fee in sorted(self.WEIGHT_BASED_RATES.items()):
-            if weight_kg <= max_weight:
-                return fee
+        idx = bisect.bisect_left(self._SORTED_THRESHOLDS, weight_kg)
+        if idx < len(self._SORTED_FEES):
+            return self._SORTED_FEES[idx]
 
         # 5kg 초과: 1kg당 3,500원 추가
         base_fee = self.WEIGHT_BASED_RATES[5.0]
-        import math
         extra_kg = math.ceil(weight_kg - 5.0)
         return base_fee + (extra_kg * 3500)
 
+    def get_fees_by_weight(self, weights: np.ndarray) -> np.ndarray:
+        """무게 배열에 대한 배송비 일괄 조회 (_get_fee_by_weight의 벡터 버전)"""
+        weights = np.asarray(weights, dtype=np.float64)
+        idx = np.searchsorted(self._RATE_THRESHOLDS, weights, side='left')
+        overflow = idx >= len(self._RATE_THRESHOLDS)
+
+        fees = self._RATE_FEES[np.minimum(idx, len(self._RATE_FEES) - 1)]
+
+        # 5kg 초과: 1kg당 3,500원 추가
+        if overflow.any():
+            extra_kg = np.ceil(weights[overflow] - 5.0).astype(np.int64)
+            fees = fees.copy()
+            fees[overflow] = self.WEIGHT_BASED_RATES[5.0] + extra_kg * 3500
+
+        return fees
+
 
 class PriceCalculator:
     """판매가 자동 계산"""
 
+    # FX API circuit breaker state (shared by all instances)
+    _cb_failures = 0
+    _cb_open_until = 0.0
+
     def __init__(self):
-        self.exchange_rate = self._get_exchange_rate()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(max_retries=_FX_RETRY)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
         self.shipping_calculator = ShippingCalculator()
 
+        # Exchange rate is fetched lazily and refreshed after the TTL
+        self._rate = None
+        self._rate_expires_at = 0.0
+        self._rate_ttl = FX_CACHE_TTL_SECONDS
+        self._rate_is_fallback = False
+
+    @property
+    def exchange_rate(self) -> float:
+        """
+        CNY to KRW rate, cached for _rate_ttl seconds
+        Fallback rates are cached for FX_FALLBACK_TTL_SECONDS, and at least until
+        the circuit breaker closes, so callers don't re-read the disk cache or
+        block on API retries on every access
+        """
+        if self._rate is None or time.monotonic() >= self._rate_expires_at:
+            self._rate = self._get_exchange_rate()
+            if self._rate_is_fallback:
+                self._rate_expires_at = max(
+                    time.monotonic() + FX_FALLBACK_TTL_SECONDS,
+                    PriceCalculator._cb_open_until
+                )
+            else:
+                self._rate_expires_at = time.monotonic() + self._rate_ttl
+        return self._rate
+
     def calculate_selling_price(
         self,
         taobao_price_cny: float,
@@ -189,7 +279,8 @@ class PriceCalculator:
         """
         try:
             # 1. 환율 적용
-            taobao_price_krw = int(taobao_price_cny * self.exchange_rate)
+            exchange_rate = self.exchange_rate
+            taobao_price_krw = int(taobao_price_cny * exchange_rate)
 
             # 2. 배송비 계산
             shipping_result = self.shipping_calculator.calculate_shipping(
@@ -214,7 +305,7 @@ class PriceCalculator:
             return {
                 'taobao_price_cny': taobao_price_cny,
                 'taobao_price_krw': taobao_price_krw,
-                'exchange_rate': self.exchange_rate,
+                'exchange_rate': exchange_rate,
                 'shipping_fee': shipping_fee,
                 'shipping_details': shipping_result,
                 'total_cost': total_cost,
@@ -242,11 +333,26 @@ class PriceCalculator:
         실시간 환율 조회 (CNY to KRW)
 
         API: https://api.exchangerate-api.com/v4/latest/CNY
+        Uses the on-disk cache when it is still fresh, and falls back to it
+        (then to the default) when the API fails or the circuit breaker is open.
         """
+        cached = self._load_cached_rate()
+        if cached and time.time() - cached['fetched_at'] <= self._rate_ttl:
+            logger.info(f"✅ Exchange rate (disk cache): 1 CNY = {cached['rate']:.2f} KRW")
+            self._rate_is_fallback = False
+            return cached['rate']
+
+        fallback_rate = cached['rate'] if cached else DEFAULT_EXCHANGE_RATE
+
+        # Circuit open: fail fast without touching the network
+        if time.monotonic() < PriceCalculator._cb_open_until:
+            self._rate_is_fallback = True
+            return fallback_rate
+
         try:
             logger.info("🔄 Fetching CNY to KRW exchange rate...")
 
-            response = requests.get(
+            response = self._session.get(
                 'https://api.exchangerate-api.com/v4/latest/CNY',
                 timeout=5
             )
@@ -256,42 +362,155 @@ class PriceCalculator:
             krw_rate = data['rates']['KRW']
 
             logger.info(f"✅ Exchange rate: 1 CNY = {krw_rate:.2f} KRW")
+            self._save_cached_rate(krw_rate)
+
+            # Close circuit
+            PriceCalculator._cb_failures = 0
+            PriceCalculator._cb_open_until = 0.0
+            self._rate_is_fallback = False
             return krw_rate
 
         except Exception as e:
-            logger.warning(f"⚠️ Exchange rate API failed, using default: {str(e)}")
-            return 190.0  # 기본값
+            PriceCalculator._cb_failures += 1
+            if PriceCalculator._cb_failures >= FX_BREAKER_THRESHOLD:
+                PriceCalculator._cb_open_until = time.monotonic() + FX_BREAKER_COOLDOWN_SECONDS
+                logger.warning(
+                    f"⚠️ Exchange rate API failed {PriceCalculator._cb_failures} times in a row, "
+                    f"skipping it for {FX_BREAKER_COOLDOWN_SECONDS}s"
+                )
+
+            # Last resort once retries are exhausted
+            source = 'last known rate' if cached else 'default'
+            logger.warning(f"⚠️ Exchange rate API failed after retries, using {source}: {str(e)}")
+            self._rate_is_fallback = True
+            return fallback_rate
+
+    def _load_cached_rate(self) -> Optional[Dict[str, float]]:
+        """Load last-known-good rate from disk ({'rate', 'fetched_at'})"""
+        try:
+            with open(FX_CACHE_PATH, 'r') as f:
+                cached = json.load(f)
+            return {'rate': float(cached['rate']), 'fetched_at': float(cached['fetched_at'])}
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_cached_rate(self, rate: float):
+        """Persist rate to disk so restarted workers can skip the API call"""
+        try:
+            with open(FX_CACHE_PATH, 'w') as f:
+                json.dump({'rate': rate, 'fetched_at': time.time()}, f)
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to write exchange rate cache: {str(e)}")
 
-    def batch_calculate(self, products: list) -> list:
+    def batch_calculate(self, products: list, target_margin: float = 0.35) -> list:
         """
         배치 가격 계산
 
+        Weights are resolved per product (title-based estimation needs string
+        matching), then the price math runs as NumPy array operations over
+        the whole batch with a single exchange rate.
+
         Args:
             products: [{
                 'taobao_price_cny': 89,
                 'title': '맨투맨',
+                'weight_kg': 0.4,  # 선택
                 ...
             }]
+            target_margin: 목표 마진율 (기본 35%)
 
         Returns:
             같은 리스트에 price_info 추가
         """
-        results = []
-
-        for product in products:
-            price_cny = product.get('taobao_price_cny') or product.get('price', 0)
-            title = product.get('title', '')
+        if not products:
+            return []
 
-            price_info = self.calculate_selling_price(
-                taobao_price_cny=price_cny,
-                title=title
-            )
+        try:
+            price_infos = self._batch_price_infos(products, target_margin)
+        except Exception as e:
+            logger.warning(f"⚠️ Vectorized batch calculation failed, falling back: {str(e)}")
+            price_infos = [
+                self.calculate_selling_price(
+                    taobao_price_cny=product.get('taobao_price_cny') or product.get('price', 0),
+                    title=product.get('title', ''),
+                    target_margin=target_margin,
+                    weight_kg=product.get('weight_kg')
+                )
+                for product in products
+            ]
 
+        results = []
+        for product, price_info in zip(products, price_infos):
             product['price_info'] = price_info
             results.append(product)
 
         return results
 
+    def _batch_price_infos(self, products: list, target_margin: float) -> list:
+        """Compute calculate_selling_price results for a batch with NumPy"""
+        shipping = self.shipping_calculator
+        exchange_rate = self.exchange_rate
+
+        # 1. 입력값 수집 (무게 없으면 제목에서 추정)
+        prices = []
+        weights = []
+        estimated = []
+        for product in products:
+            prices.append(float(product.get('taobao_price_cny') or product.get('price') or 0))
+            weight_kg = product.get('weight_kg')
+            if weight_kg:
+                weights.append(float(weight_kg))
+                estimated.append(False)
+            else:
+                weights.append(shipping._estimate_weight_from_title(product.get('title', '')))
+                estimated.append(True)
+
+        prices_cny = np.array(prices, dtype=np.float64)
+        weights_kg = np.array(weights, dtype=np.float64)
+
+        # 2. 환율 적용 + 배송비 조회
+        prices_krw = (prices_cny * exchange_rate).astype(np.int64)
+        shipping_fees = shipping.get_fees_by_weight(weights_kg)
+
+        # 3. 총 원가 / 판매가 / 100원 단위 반올림
+        total_costs = prices_krw + shipping_fees
+        selling_prices = total_costs / (1 - target_margin)
+        rounded = (np.round(selling_prices / 100) * 100).astype(np.int64)
+
+        # 4. 실제 마진 계산
+        profits = rounded - total_costs
+        margins = np.round(
+            np.divide(profits, rounded, out=np.zeros(len(rounded)), where=rounded > 0),
+            3
+        )
+
+        price_infos = []
+        for i, price_cny in enumerate(prices):
+            weight = round(weights[i], 2)
+            fee = int(shipping_fees[i])
+            price_infos.append({
+                'taobao_price_cny': price_cny,
+                'taobao_price_krw': int(prices_krw[i]),
+                'exchange_rate': exchange_rate,
+                'shipping_fee': fee,
+                'shipping_details': {
+                    'shipping_fee': fee,
+                    'weight_used': weight,
+                    'actual_weight': weight,
+                    'volume_weight': None,
+                    'calculation_method': 'estimated' if estimated[i] else 'actual',
+                    'estimated': estimated[i]
+                },
+                'total_cost': int(total_costs[i]),
+                'target_margin': target_margin,
+                'selling_price': int(selling_prices[i]),
+                'selling_price_rounded': int(rounded[i]),
+                'expected_profit': int(profits[i]),
+                'actual_margin': float(margins[i])
+            })
+
+        return price_infos
+
 
 # Singleton instances
 _price_calculator = None
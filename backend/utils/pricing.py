@@ -3,14 +3,44 @@ Pricing calculator with 20% margin logic
 Reverse-calculates costs from competitor prices
 """
 
-from typing import Dict, Tuple
-from .shipping import calculate_shipping_cost
+from typing import Dict, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .shipping import calculate_shipping_cost, calculate_shipping_cost_array
 from .category import estimate_weight_from_title, estimate_weight_from_price, get_category_from_title
 
 
 # Fixed margin rate (20%)
 MARGIN_RATE = 0.20
 
+# Precomputed 1 / (1 + MARGIN_RATE) - multiply instead of divide for the default margin
+_INV_1P_DEFAULT_MARGIN = 1.0 / (1.0 + MARGIN_RATE)
+
+# Product fields carried into batch results, with their defaults
+_PRODUCT_DEFAULTS = {
+    'title': '',
+    'price': 0,
+    'url': '',
+    'image_url': '',
+    'sales_count': 0,
+    'rating': 0
+}
+
+# Profitability tiers: (min profit rate %, status, recommendation), highest first
+_PROFIT_TIERS = (
+    (20, 'excellent', "좋은 마진율입니다. 판매를 추천합니다."),
+    (15, 'good', "적정한 마진율입니다."),
+    (10, 'acceptable', "마진이 낮습니다. 원가 절감을 고려하세요."),
+    (float('-inf'), 'poor', "마진이 너무 낮습니다. 다른 제품을 추천합니다."),
+)
+
+# Same tiers for the vectorized path (ascending thresholds, poor -> excellent)
+_PROFIT_TIER_THRESHOLDS = np.array([tier[0] for tier in reversed(_PROFIT_TIERS[:-1])])
+_PROFIT_TIER_STATUS = np.array([tier[1] for tier in reversed(_PROFIT_TIERS)], dtype=object)
+_PROFIT_TIER_RECOMMENDATIONS = np.array([tier[2] for tier in reversed(_PROFIT_TIERS)], dtype=object)
+
 
 def calculate_cost_from_price(selling_price: int, margin_rate: float = MARGIN_RATE) -> int:
     """
@@ -25,6 +55,8 @@ def calculate_cost_from_price(selling_price: int, margin_rate: float = MARGIN_RA
     Returns:
         Estimated cost price in KRW
     """
+    if margin_rate == MARGIN_RATE:
+        return int(selling_price * _INV_1P_DEFAULT_MARGIN)
     return int(selling_price / (1 + margin_rate))
 
 
@@ -120,19 +152,10 @@ def analyze_profitability(product_costs: Dict) -> Dict:
     profit_rate = product_costs['profit_rate']
     profit = product_costs['profit']
 
-    # Profitability tiers
-    if profit_rate >= 20:
-        status = "excellent"
-        recommendation = "좋은 마진율입니다. 판매를 추천합니다."
-    elif profit_rate >= 15:
-        status = "good"
-        recommendation = "적정한 마진율입니다."
-    elif profit_rate >= 10:
-        status = "acceptable"
-        recommendation = "마진이 낮습니다. 원가 절감을 고려하세요."
-    else:
-        status = "poor"
-        recommendation = "마진이 너무 낮습니다. 다른 제품을 추천합니다."
+    # Profitability tiers (first tier whose threshold is met)
+    for threshold, status, recommendation in _PROFIT_TIERS:
+        if profit_rate >= threshold:
+            break
 
     return {
         'status': status,
@@ -142,37 +165,98 @@ def analyze_profitability(product_costs: Dict) -> Dict:
     }
 
 
-def batch_calculate_costs(products: list) -> list:
+def analyze_profitability_array(profit_rates: np.ndarray, profits: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized analyze_profitability() for a whole batch
+
+    Args:
+        profit_rates: Array of profit rates (%)
+        profits: Array of profits in KRW
+
+    Returns:
+        Tuple of (status, recommendation, is_profitable) arrays
+    """
+    idx = np.searchsorted(_PROFIT_TIER_THRESHOLDS, profit_rates, side='right')
+    return _PROFIT_TIER_STATUS[idx], _PROFIT_TIER_RECOMMENDATIONS[idx], np.asarray(profits) > 0
+
+
+def batch_calculate_costs(products: Union[list, pd.DataFrame]) -> list:
     """
     Calculate costs for multiple products
 
+    Title-based category/weight estimation runs once per distinct title,
+    and shipping, cost and profit math runs as column operations.
+
     Args:
-        products: List of dicts with 'title' and 'price' keys
+        products: List of dicts with 'title' and 'price' keys, or a DataFrame
+            with those columns (faster for large scraped lists - only the
+            needed columns are used, missing ones get default values)
 
     Returns:
-        List of product cost dicts
+        List of product cost dicts (same shape as calculate_product_costs()
+        plus original product data and profitability analysis)
     """
-    results = []
-
-    for product in products:
-        costs = calculate_product_costs(
-            product.get('title', ''),
-            product.get('price', 0)
-        )
-
-        # Add original product data
-        costs.update({
-            'title': product.get('title', ''),
-            'url': product.get('url', ''),
-            'image_url': product.get('image_url', ''),
-            'sales_count': product.get('sales_count', 0),
-            'rating': product.get('rating', 0)
+    if len(products) == 0:
+        return []
+
+    # Keep only the fields we need, with the same defaults as product.get()
+    # (object dtype so pass-through values come back unchanged)
+    if isinstance(products, pd.DataFrame):
+        df = pd.DataFrame({
+            key: products[key].astype(object).where(products[key].notna(), default) if key in products else default
+            for key, default in _PRODUCT_DEFAULTS.items()
+        }, index=products.index).reset_index(drop=True)
+    else:
+        df = pd.DataFrame({
+            key: pd.Series([product.get(key, default) for product in products], dtype=object)
+            for key, default in _PRODUCT_DEFAULTS.items()
         })
 
-        # Add profitability analysis
-        analysis = analyze_profitability(costs)
-        costs.update(analysis)
+    prices = pd.to_numeric(df['price'], downcast='integer').to_numpy()
+
+    # Estimate product category and weight once per distinct title
+    # (missing titles become '' - factorize would code them -1, i.e. the last title)
+    title_codes, unique_titles = pd.factorize(df['title'].fillna(''))
+    unique_categories = [get_category_from_title(title) for title in unique_titles]
+    unique_weights = np.array([estimate_weight_from_title(title) for title in unique_titles], dtype=np.float64)
 
-        results.append(costs)
+    categories = np.array(unique_categories, dtype=object)[title_codes]
+    weights = unique_weights[title_codes]
 
-    return results
+    # If title matching failed, use price-based estimation
+    fallback = (weights == 1.0) & (categories == "기타")
+    for i in np.flatnonzero(fallback):
+        weights[i] = estimate_weight_from_price(prices[i])
+
+    # Cost columns (int32 is plenty for KRW amounts)
+    shipping_cost = calculate_shipping_cost_array(weights)
+    cost_price = (prices * _INV_1P_DEFAULT_MARGIN).astype(np.int32)
+    total_cost = cost_price + shipping_cost
+    profit = (prices - total_cost).astype(np.int32)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profit_rate = np.where(prices > 0, profit / prices * 100, 0.0).round(2)
+
+    result = pd.DataFrame({
+        'category': pd.Categorical(categories),
+        'estimated_weight': weights.round(2),
+        'cost_price': cost_price,
+        'shipping_cost': shipping_cost,
+        'total_cost': total_cost,
+        'selling_price': prices.astype(np.int32),
+        'profit': profit,
+        'profit_rate': profit_rate,
+        'title': df['title'],
+        'url': df['url'],
+        'image_url': df['image_url'],
+        'sales_count': df['sales_count'],
+        'rating': df['rating'],
+    })
+
+    # Add profitability analysis
+    status, recommendation, is_profitable = analyze_profitability_array(profit_rate, profit)
+    result['status'] = status
+    result['recommendation'] = recommendation
+    result['is_profitable'] = is_profitable
+    result['profit_tier'] = status
+
+    return result.to_dict('records')
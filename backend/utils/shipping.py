@@ -3,6 +3,8 @@ Aceship GOLD Shipping Rate Calculator
 Based on weight tiers from user's rate table
 """
 
+import numpy as np
+
 # Aceship GOLD shipping rates (KRW)
 ACESHIP_RATES = {
     0.5: 5600,
@@ -28,6 +30,31 @@ ACESHIP_RATES = {
 }
 
 
+# Sorted tier boundaries and rates for vectorized lookup
+_TIERS = np.array(sorted(ACESHIP_RATES), dtype=np.float64)
+_RATES = np.array([ACESHIP_RATES[tier] for tier in sorted(ACESHIP_RATES)], dtype=np.int32)
+
+
+def calculate_shipping_cost_array(weights_kg) -> np.ndarray:
+    """
+    Calculate Aceship GOLD shipping costs for many weights at once
+
+    Each weight is rounded up to the nearest 0.5kg tier via np.searchsorted,
+    capped at 10kg (maximum in rate table). Weights <= 0 cost nothing.
+
+    Args:
+        weights_kg: Array-like of product weights in kilograms
+
+    Returns:
+        int32 array of shipping costs in KRW
+    """
+    weights = np.asarray(weights_kg, dtype=np.float64)
+    idx = np.minimum(np.searchsorted(_TIERS, weights, side='left'), len(_TIERS) - 1)
+    rates = _RATES[idx]
+    rates[weights <= 0] = 0
+    return rates
+
+
 def calculate_shipping_cost(weight_kg: float) -> int:
     """
     Calculate Aceship GOLD shipping cost based on weight
@@ -38,19 +65,7 @@ def calculate_shipping_cost(weight_kg: float) -> int:
     Returns:
         Shipping cost in KRW
     """
-    if weight_kg <= 0:
-        return 0
-
-    # Find the appropriate tier
-    # Round up to nearest 0.5kg tier
-    import math
-    tier_weight = math.ceil(weight_kg * 2) / 2
-
-    # Cap at 10kg (maximum in rate table)
-    if tier_weight > 10.0:
-        tier_weight = 10.0
-
-    return ACESHIP_RATES.get(tier_weight, ACESHIP_RATES[10.0])
+    return int(calculate_shipping_cost_array([weight_kg])[0])
 
 
 def get_all_rates() -> dict:
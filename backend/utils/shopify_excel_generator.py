@@ -3,10 +3,10 @@ Shopify Excel Generator - Shopify 업로드용 CSV/Excel 파일 생성
 Shopify Product Import CSV 형식 생성
 """
 import os
+import csv
 import logging
 from datetime import datetime
 from typing import List, Dict, Any
-import pandas as pd
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +48,9 @@ class ShopifyExcelGenerator:
         'Notes',  # 메모
     ]
 
+    # 추가 이미지 키 (최대 9개) - 상품마다 f-string을 만들지 않도록 미리 생성
+    _IMG_KEYS = tuple(f'image_{i}' for i in range(1, 10))
+
     def generate_excel(
         self,
         products: List[Dict[str, Any]],
@@ -67,34 +70,37 @@ class ShopifyExcelGenerator:
             if not products:
                 raise ValueError("상품 데이터가 없습니다")
 
-            # 데이터 변환
-            rows = []
-            for idx, product in enumerate(products, 1):
-                # 각 이미지마다 별도 행 생성 (Shopify 포맷)
-                images = self._extract_images(product)
-
-                # 첫 번째 행: 모든 정보 포함
-                first_row = self._format_product_row(product, idx, image_position=1, image_url=images[0] if images else '')
-                rows.append(first_row)
-
-                # 추가 이미지들: 이미지 정보만 포함
-                for img_idx, img_url in enumerate(images[1:], start=2):
-                    image_row = self._format_image_row(product, img_idx, img_url)
-                    rows.append(image_row)
-
-            # DataFrame 생성
-            df = pd.DataFrame(rows, columns=self.REQUIRED_COLUMNS)
-
             # 파일명 생성
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f'shopify_products_{timestamp}.csv'
             filepath = os.path.join(output_dir, filename)
 
-            # CSV 저장 (Shopify는 CSV 포맷 사용)
-            df.to_csv(filepath, index=False, encoding='utf-8-sig')
+            # CSV 스트리밍 저장 (Shopify는 CSV 포맷 사용) - 행을 메모리에 쌓지 않음
+            total_rows = 0
+            with open(filepath, 'w', encoding='utf-8', newline='') as f:
+                # Excel 한글 호환용 BOM은 한 번만 기록하고 나머지는 일반 utf-8로 인코딩
+                f.write('\ufeff')
+                writer = csv.writer(f, lineterminator='\n')
+                writer.writerow(self.REQUIRED_COLUMNS)
+
+                for idx, product in enumerate(products, 1):
+                    # 각 이미지마다 별도 행 생성 (Shopify 포맷)
+                    images = self._extract_images(product)
+
+                    # 첫 번째 행: 모든 정보 포함
+                    writer.writerow(self._format_product_row(product, idx, image_position=1, image_url=images[0] if images else ''))
+                    total_rows += 1
+
+                    # 추가 이미지들: 이미지 정보만 포함 (handle/alt 텍스트는 상품당 한 번만 계산)
+                    if len(images) > 1:
+                        handle = self._generate_handle(product, idx)
+                        alt_title = (product.get('korean_title') or product.get('title', ''))[:50]
+                        for img_idx, img_url in enumerate(images[1:], start=2):
+                            writer.writerow(self._format_image_row(handle, alt_title, img_idx, img_url))
+                            total_rows += 1
 
             logger.info(f"✅ Shopify CSV 생성 완료: {filepath}")
-            logger.info(f"📊 총 {len(products)}개 상품, {len(rows)}개 행")
+            logger.info(f"📊 총 {len(products)}개 상품, {total_rows}개 행")
 
             return filepath
 
@@ -107,14 +113,15 @@ class ShopifyExcelGenerator:
         images = []
 
         # 대표 이미지
-        if product.get('main_image'):
-            images.append(product['main_image'])
+        main_image = product.get('main_image')
+        if main_image:
+            images.append(main_image)
 
         # 추가 이미지들
-        for i in range(1, 10):  # 최대 9개 추가 이미지
-            img_key = f'image_{i}'
-            if product.get(img_key):
-                images.append(product[img_key])
+        for img_key in self._IMG_KEYS:
+            img_url = product.get(img_key)
+            if img_url:
+                images.append(img_url)
 
         return images[:10]  # Shopify 최대 이미지 제한
 
@@ -181,15 +188,13 @@ class ShopifyExcelGenerator:
 
     def _format_image_row(
         self,
-        product: Dict[str, Any],
+        handle: str,
+        alt_title: str,
         image_position: int,
         image_url: str
     ) -> List[Any]:
         """추가 이미지를 위한 행 생성 (나머지 필드는 비움)"""
 
-        handle = self._generate_handle(product, 0)
-        title = product.get('korean_title') or product.get('title', '')
-
         return [
             handle,  # Handle (동일한 상품)
             '',  # Title (비움)
@@ -214,7 +219,7 @@ class ShopifyExcelGenerator:
             '',  # Variant Taxable (비움)
             image_url,  # Image Src
             image_position,  # Image Position
-            title[:50],  # Image Alt Text
+            alt_title,  # Image Alt Text
             '',  # Status (비움)
             '',  # Taobao ID (비움)
             '',  # Taobao Price (비움)
@@ -3,7 +3,7 @@ Workers package - Background jobs and scheduler
 """
 from workers.scheduler import scheduler, init_scheduler, shutdown_scheduler, add_job, remove_job, get_job, get_all_jobs
 from workers.purchase_worker import execute_purchase_job
-from workers.forwarder_worker import execute_forwarder_job
+from workers.forwarder_worker import execute_forwarder_job, execute_forwarder_jobs_batch
 
 __all__ = [
     'scheduler',
@@ -14,5 +14,6 @@ __all__ = [
     'get_job',
     'get_all_jobs',
     'execute_purchase_job',
-    'execute_forwarder_job'
+    'execute_forwarder_job',
+    'execute_forwarder_jobs_batch'
 ]
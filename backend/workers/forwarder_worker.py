@@ -2,19 +2,27 @@
 Forwarder worker - Background job for shipping to forwarder
 Handles forwarder automation with retry logic
 """
+import os
 import logging
+import random
 import uuid
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
 
 from models import get_db, Order, OrderStatus, AuditLog
+from workers.scheduler import add_job
 
 logger = logging.getLogger(__name__)
 
-# Retry configuration
+# Retry configuration (delay doubles per attempt, plus up to RETRY_DELAY_SECONDS of jitter)
 MAX_RETRIES = 3
 RETRY_DELAY_SECONDS = 30
 
+# Simulated forwarder API latency (0 = no artificial delay, jobs drain immediately)
+SIMULATED_API_DELAY_SECONDS = float(os.getenv('FORWARDER_SIMULATED_DELAY_SECONDS', '0'))
+
 
 def execute_forwarder_job(order_id: str, job_id: str, forwarder_id: str, retry_count: int = 0):
     """
@@ -28,135 +36,204 @@ def execute_forwarder_job(order_id: str, job_id: str, forwarder_id: str, retry_c
     """
     logger.info(f"🔄 [Job {job_id}] Starting forwarder job for order {order_id} (attempt {retry_count + 1}/{MAX_RETRIES})")
 
-    try:
-        with get_db() as db:
-            # Get order
-            order = db.query(Order).filter(Order.id == order_id).first()
+    with get_db() as db:
+        try:
+            # Get order (primary key lookup hits the identity map first)
+            order = db.get(Order, order_id)
 
             if not order:
                 logger.error(f"❌ [Job {job_id}] Order {order_id} not found")
                 return
 
-            # Check if order is still in correct status
-            if order.status != OrderStatus.FORWARDER_SENDING:
-                logger.warning(f"⚠️ [Job {job_id}] Order {order_id} is no longer in FORWARDER_SENDING status (current: {order.status.value})")
+            audit_row, backoff = _process_forwarder_order(order, job_id, forwarder_id, retry_count)
+            if audit_row is None:
                 return
 
-            # Simulate forwarder API call
-            success, tracking_number = _call_forwarder_api(order, job_id, forwarder_id, retry_count)
-
-            if success:
-                # Update order to success
-                order.status = OrderStatus.SENT_TO_FORWARDER
-                order.forwarder_job_id = f'FWD-{str(uuid.uuid4())[:8].upper()}'
-                order.updated_at = datetime.utcnow()
-
-                if not order.meta:
-                    order.meta = {}
-                order.meta['forwarder_completed_at'] = datetime.utcnow().isoformat()
-                order.meta['tracking_number'] = tracking_number
-                order.meta['forwarder_job_attempts'] = retry_count + 1
-
-                # Create audit log
-                audit = AuditLog(
-                    order_id=order.id,
-                    actor='system',
-                    action='forwarder_completed',
-                    meta={
-                        'job_id': job_id,
-                        'forwarder_job_id': order.forwarder_job_id,
-                        'tracking_number': tracking_number,
-                        'attempts': retry_count + 1
-                    }
-                )
-                db.add(audit)
-                db.commit()
-
-                logger.info(f"✅ [Job {job_id}] Forwarder job completed successfully for order {order_id} (tracking: {tracking_number})")
-
-            else:
-                # Handle failure
-                if retry_count < MAX_RETRIES - 1:
-                    # Retry
-                    order.status = OrderStatus.RETRYING
-                    order.updated_at = datetime.utcnow()
-
-                    if not order.meta:
-                        order.meta = {}
-                    order.meta['last_retry_at'] = datetime.utcnow().isoformat()
-                    order.meta['retry_count'] = retry_count + 1
-
-                    # Create audit log
-                    audit = AuditLog(
-                        order_id=order.id,
-                        actor='system',
-                        action='forwarder_retry_scheduled',
-                        meta={
-                            'job_id': job_id,
-                            'retry_count': retry_count + 1,
-                            'next_retry_in': f'{RETRY_DELAY_SECONDS}s'
-                        }
-                    )
-                    db.add(audit)
-                    db.commit()
-
-                    logger.warning(f"⚠️ [Job {job_id}] Forwarder job failed for order {order_id}, scheduling retry {retry_count + 2}/{MAX_RETRIES} in {RETRY_DELAY_SECONDS}s")
-
-                    # Schedule retry
-                    from workers.scheduler import add_job
-                    from datetime import timedelta
-                    retry_time = datetime.utcnow() + timedelta(seconds=RETRY_DELAY_SECONDS)
-                    add_job(
-                        func=execute_forwarder_job,
-                        job_id=f"{job_id}-retry-{retry_count + 1}",
-                        run_date=retry_time,
-                        order_id=order_id,
-                        forwarder_id=forwarder_id,
-                        retry_count=retry_count + 1
-                    )
-
-                else:
-                    # Max retries reached, move to manual review
-                    order.status = OrderStatus.MANUAL_REVIEW
-                    order.updated_at = datetime.utcnow()
-
-                    if not order.meta:
-                        order.meta = {}
-                    order.meta['failure_reason'] = 'Max retries reached for forwarder job'
-                    order.meta['failed_at'] = datetime.utcnow().isoformat()
-                    order.meta['total_attempts'] = retry_count + 1
-
-                    # Create audit log
-                    audit = AuditLog(
-                        order_id=order.id,
-                        actor='system',
-                        action='forwarder_failed',
-                        meta={
-                            'job_id': job_id,
-                            'reason': 'Max retries reached',
-                            'total_attempts': retry_count + 1
-                        }
-                    )
-                    db.add(audit)
-                    db.commit()
+            db.add(AuditLog(**audit_row))
+            db.commit()
 
-                    logger.error(f"❌ [Job {job_id}] Forwarder job failed for order {order_id} after {retry_count + 1} attempts, moved to MANUAL_REVIEW")
+            if backoff is not None:
+                _schedule_retry(job_id, order_id, forwarder_id, retry_count, backoff)
 
-    except Exception as e:
-        logger.error(f"❌ [Job {job_id}] Exception in forwarder job for order {order_id}: {str(e)}")
-        # Try to update order status
-        try:
-            with get_db() as db:
-                order = db.query(Order).filter(Order.id == order_id).first()
+        except Exception as e:
+            logger.error(f"❌ [Job {job_id}] Exception in forwarder job for order {order_id}: {str(e)}")
+            # Try to update order status in the same session
+            try:
+                db.rollback()
+                order = db.get(Order, order_id)
                 if order:
-                    order.status = OrderStatus.FAILED
-                    order.updated_at = datetime.utcnow()
-                    if not order.meta:
-                        order.meta = {}
-                    order.meta['failure_reason'] = f'Exception: {str(e)}'
+                    _mark_order_failed(order, e)
                     db.commit()
-        except:
-            pass
+            except Exception:
+                db.rollback()
+
+
+def execute_forwarder_jobs_batch(order_ids: list, job_id: str, forwarder_id: str, retry_count: int = 0):
+    """
+    Background job to send many orders to forwarder in one session
+
+    Orders are loaded with a single IN query and all audit logs are written
+    with one bulk INSERT and one commit, instead of a round-trip per order.
+
+    Args:
+        order_ids: List of order UUIDs
+        job_id: Job identifier (shared by all orders in the batch)
+        forwarder_id: Forwarder service ID
+        retry_count: Current retry attempt (0-based)
+    """
+    logger.info(f"🔄 [Job {job_id}] Starting forwarder batch job for {len(order_ids)} orders (attempt {retry_count + 1}/{MAX_RETRIES})")
+
+    with get_db() as db:
+        orders = db.query(Order).filter(Order.id.in_(order_ids)).all()
+
+        missing = set(map(str, order_ids)) - {str(order.id) for order in orders}
+        if missing:
+            logger.error(f"❌ [Job {job_id}] Orders not found: {', '.join(sorted(missing))}")
+
+        audit_rows = []
+        retries = []
+        for order in orders:
+            try:
+                audit_row, backoff = _process_forwarder_order(order, job_id, forwarder_id, retry_count)
+            except Exception as e:
+                logger.error(f"❌ [Job {job_id}] Exception in forwarder job for order {order.id}: {str(e)}")
+                _mark_order_failed(order, e)
+                continue
+
+            if audit_row is not None:
+                audit_rows.append(audit_row)
+            if backoff is not None:
+                retries.append((str(order.id), backoff))
+
+        if audit_rows:
+            db.execute(insert(AuditLog), audit_rows)
+        db.commit()
+
+    # Schedule retries only after the batch is committed
+    for order_id, backoff in retries:
+        _schedule_retry(f"{job_id}-{order_id}", order_id, forwarder_id, retry_count, backoff)
+
+    logger.info(f"✅ [Job {job_id}] Forwarder batch job finished: {len(audit_rows)} processed, {len(retries)} retries scheduled")
+
+
+def _process_forwarder_order(order: Order, job_id: str, forwarder_id: str, retry_count: int) -> tuple:
+    """
+    Call the forwarder API for one order and apply the result to it (no commit)
+
+    Returns:
+        tuple: (audit_row: dict or None, backoff: float or None)
+            audit_row is None when the order was skipped;
+            backoff is set when a retry should be scheduled after commit
+    """
+    order_id = str(order.id)
+
+    # Check if order is still in correct status
+    if order.status != OrderStatus.FORWARDER_SENDING:
+        logger.warning(f"⚠️ [Job {job_id}] Order {order_id} is no longer in FORWARDER_SENDING status (current: {order.status.value})")
+        return None, None
+
+    # Simulate forwarder API call
+    success, tracking_number = _call_forwarder_api(order, job_id, forwarder_id, retry_count)
+
+    now = datetime.utcnow()
+
+    if success:
+        # Update order to success
+        order.status = OrderStatus.SENT_TO_FORWARDER
+        order.forwarder_job_id = f'FWD-{str(uuid.uuid4())[:8].upper()}'
+        order.updated_at = now
+
+        if not order.meta:
+            order.meta = {}
+        order.meta['forwarder_completed_at'] = now.isoformat()
+        order.meta['tracking_number'] = tracking_number
+        order.meta['forwarder_job_attempts'] = retry_count + 1
+
+        logger.info(f"✅ [Job {job_id}] Forwarder job completed successfully for order {order_id} (tracking: {tracking_number})")
+
+        return {
+            'order_id': order.id,
+            'actor': 'system',
+            'action': 'forwarder_completed',
+            'meta': {
+                'job_id': job_id,
+                'forwarder_job_id': order.forwarder_job_id,
+                'tracking_number': tracking_number,
+                'attempts': retry_count + 1
+            }
+        }, None
+
+    # Handle failure
+    if retry_count < MAX_RETRIES - 1:
+        # Retry with exponential backoff + jitter (avoid synchronized retry storms)
+        backoff = RETRY_DELAY_SECONDS * (2 ** retry_count) + random.uniform(0, RETRY_DELAY_SECONDS)
+
+        order.status = OrderStatus.RETRYING
+        order.updated_at = now
+
+        if not order.meta:
+            order.meta = {}
+        order.meta['last_retry_at'] = now.isoformat()
+        order.meta['retry_count'] = retry_count + 1
+
+        logger.warning(f"⚠️ [Job {job_id}] Forwarder job failed for order {order_id}, scheduling retry {retry_count + 2}/{MAX_RETRIES} in {backoff:.0f}s")
+
+        return {
+            'order_id': order.id,
+            'actor': 'system',
+            'action': 'forwarder_retry_scheduled',
+            'meta': {
+                'job_id': job_id,
+                'retry_count': retry_count + 1,
+                'next_retry_in': f'{backoff:.0f}s',
+                'backoff_seconds': round(backoff, 1)
+            }
+        }, backoff
+
+    # Max retries reached, move to manual review
+    order.status = OrderStatus.MANUAL_REVIEW
+    order.updated_at = now
+
+    if not order.meta:
+        order.meta = {}
+    order.meta['failure_reason'] = 'Max retries reached for forwarder job'
+    order.meta['failed_at'] = now.isoformat()
+    order.meta['total_attempts'] = retry_count + 1
+
+    logger.error(f"❌ [Job {job_id}] Forwarder job failed for order {order_id} after {retry_count + 1} attempts, moved to MANUAL_REVIEW")
+
+    return {
+        'order_id': order.id,
+        'actor': 'system',
+        'action': 'forwarder_failed',
+        'meta': {
+            'job_id': job_id,
+            'reason': 'Max retries reached',
+            'total_attempts': retry_count + 1
+        }
+    }, None
+
+
+def _schedule_retry(job_id: str, order_id: str, forwarder_id: str, retry_count: int, backoff: float):
+    """Schedule the next forwarder attempt for an order after backoff seconds"""
+    retry_time = datetime.utcnow() + timedelta(seconds=backoff)
+    add_job(
+        func=execute_forwarder_job,
+        job_id=f"{job_id}-retry-{retry_count + 1}",
+        run_date=retry_time,
+        order_id=order_id,
+        forwarder_id=forwarder_id,
+        retry_count=retry_count + 1
+    )
+
+
+def _mark_order_failed(order: Order, error: Exception):
+    """Move order to FAILED after an unexpected exception (no commit)"""
+    order.status = OrderStatus.FAILED
+    order.updated_at = datetime.utcnow()
+    if not order.meta:
+        order.meta = {}
+    order.meta['failure_reason'] = f'Exception: {str(error)}'
 
 
 def _call_forwarder_api(order: Order, job_id: str, forwarder_id: str, retry_count: int) -> tuple:
@@ -174,11 +251,11 @@ def _call_forwarder_api(order: Order, job_id: str, forwarder_id: str, retry_coun
         tuple: (success: bool, tracking_number: str or None)
     """
     try:
-        # Simulate API call delay
-        time.sleep(1.5)
+        # Simulate API call delay (opt-in; blocks a scheduler thread while sleeping)
+        if SIMULATED_API_DELAY_SECONDS > 0:
+            time.sleep(SIMULATED_API_DELAY_SECONDS)
 
         # Simulate 95% success rate (5% failure for testing retry logic)
-        import random
         success_rate = 0.95 if retry_count == 0 else 0.98  # Higher success on retries
 
         if random.random() < success_rate:
@@ -2,12 +2,17 @@
 Purchase worker - Background job for supplier order execution
 Handles purchase automation with retry logic
 """
+import os
 import logging
+import random
 import uuid
-import time
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
-from models import get_db, Order, OrderStatus, AuditLog
+from sqlalchemy import update, func, cast, or_, DateTime
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+
+from models import get_db, Order, OrderStatus, AuditLog, DeadLetterOrder
+from workers.scheduler import add_job
 
 logger = logging.getLogger(__name__)
 
@@ -15,45 +20,117 @@ logger = logging.getLogger(__name__)
 MAX_RETRIES = 3
 RETRY_DELAY_SECONDS = 30
 
+# Simulated supplier response time (handled by a scheduled callback, not a sleeping thread)
+SUPPLIER_RESPONSE_DELAY_SECONDS = float(os.getenv('SIMULATE_SUPPLIER_DELAY', '2'))
+
+# An in-flight supplier request older than this is treated as lost and may be reclaimed
+STALE_CLAIM_SECONDS = 300
+
+
+def _purchase_job_id(order_id: str, retry_count: int) -> str:
+    """Deterministic job id per order + attempt, so a re-queued attempt replaces instead of duplicating"""
+    return f"purchase-{order_id}-attempt-{retry_count + 1}"
+
 
-def execute_purchase_job(order_id: str, job_id: str, retry_count: int = 0):
+def execute_purchase_job(order_id: str, job_id: str = None, retry_count: int = 0):
     """
     Background job to execute purchase with supplier
 
+    Submits the supplier order and returns right away; the supplier's
+    response is handled by a follow-up job so no worker thread sits idle
+    waiting on it.
+
     Args:
         order_id: Order UUID
-        job_id: Job identifier
+        job_id: Job identifier (defaults to the deterministic per-attempt id)
         retry_count: Current retry attempt (0-based)
     """
+    job_id = job_id or _purchase_job_id(order_id, retry_count)
     logger.info(f"🔄 [Job {job_id}] Starting purchase execution for order {order_id} (attempt {retry_count + 1}/{MAX_RETRIES})")
 
-    try:
-        with get_db() as db:
-            # Get order
-            order = db.query(Order).filter(Order.id == order_id).first()
+    with get_db() as db:
+        try:
+            # Claim order: skip it if another run already has a supplier request in flight
+            order = _claim_order(db, order_id)
 
             if not order:
-                logger.error(f"❌ [Job {job_id}] Order {order_id} not found")
+                logger.warning(f"⚠️ [Job {job_id}] Order {order_id} not found, not waiting for a supplier order, or already in flight")
                 return
 
-            # Check if order is still in correct status
-            if order.status != OrderStatus.SUPPLIER_ORDERING:
-                logger.warning(f"⚠️ [Job {job_id}] Order {order_id} is no longer in SUPPLIER_ORDERING status (current: {order.status.value})")
+            # Mark the request in flight in the same transaction as the claim, so a
+            # second run of this job cannot claim the row once the lock is released
+            _update_order(
+                db, order.id,
+                {'supplier_job_id': job_id, 'supplier_job_claimed_at': datetime.now(timezone.utc).isoformat()},
+                status=OrderStatus.SUPPLIER_ORDERING,
+                updated_at=datetime.utcnow()
+            )
+            db.commit()
+
+            # Schedule the response callback before submitting, so a scheduling
+            # failure never leaves a submitted order with nothing to handle it
+            scheduled = add_job(
+                func=_handle_supplier_response,
+                job_id=f'{job_id}-resp',
+                run_date=datetime.utcnow() + timedelta(seconds=SUPPLIER_RESPONSE_DELAY_SECONDS),
+                order_id=order_id,
+                max_instances=1,
+                purchase_job_id=job_id,
+                retry_count=retry_count
+            )
+            if not scheduled:
+                raise RuntimeError(f'Failed to schedule supplier response job {job_id}-resp')
+
+            # Submit supplier order, handled by the scheduled callback
+            _submit_supplier_request(order, job_id)
+
+        except Exception as e:
+            logger.error(f"❌ [Job {job_id}] Exception in purchase job for order {order_id}: {str(e)}")
+            _mark_order_failed(db, order_id, e)
+
+
+def _handle_supplier_response(order_id: str, purchase_job_id: str, retry_count: int = 0):
+    """
+    Scheduled callback: apply the supplier's response to the order
+
+    Args:
+        order_id: Order UUID
+        purchase_job_id: Job identifier of the purchase job that submitted the order
+        retry_count: Current retry attempt (0-based)
+    """
+    job_id = purchase_job_id
+
+    with get_db() as db:
+        try:
+            # Claim order: only the response to the request this job submitted
+            order = _claim_order(db, order_id, in_flight_job_id=job_id)
+
+            if not order:
+                logger.warning(f"⚠️ [Job {job_id}] Order {order_id} not found, no longer waiting on this supplier request, or claimed by another worker")
                 return
 
-            # Simulate supplier API call
-            success = _call_supplier_api(order, job_id, retry_count)
+            # Simulated supplier response
+            success = _receive_supplier_response(order, job_id, retry_count)
+
+            # One timestamp for every column/meta/schedule update of this response
+            now = datetime.utcnow()
+            now_iso = now.isoformat()
 
             if success:
                 # Update order to success
-                order.status = OrderStatus.ORDERED_SUPPLIER
-                order.supplier_order_id = f'SUP-{str(uuid.uuid4())[:8].upper()}'
-                order.updated_at = datetime.utcnow()
-
-                if not order.meta:
-                    order.meta = {}
-                order.meta['purchase_completed_at'] = datetime.utcnow().isoformat()
-                order.meta['purchase_job_attempts'] = retry_count + 1
+                supplier_order_id = f'SUP-{str(uuid.uuid4())[:8].upper()}'
+                _update_order(
+                    db, order.id,
+                    {
+                        'purchase_completed_at': now_iso,
+                        'purchase_job_attempts': retry_count + 1,
+                        'supplier_job_id': None,
+                        'supplier_job_claimed_at': None
+                    },
+                    status=OrderStatus.ORDERED_SUPPLIER,
+                    supplier_order_id=supplier_order_id,
+                    updated_at=now
+                )
 
                 # Create audit log
                 audit = AuditLog(
@@ -62,26 +139,29 @@ def execute_purchase_job(order_id: str, job_id: str, retry_count: int = 0):
                     action='purchase_completed',
                     meta={
                         'job_id': job_id,
-                        'supplier_order_id': order.supplier_order_id,
+                        'supplier_order_id': supplier_order_id,
                         'attempts': retry_count + 1
                     }
                 )
                 db.add(audit)
-                db.commit()
 
-                logger.info(f"✅ [Job {job_id}] Purchase completed successfully for order {order_id} (supplier order: {order.supplier_order_id})")
+                logger.info(f"✅ [Job {job_id}] Purchase completed successfully for order {order_id} (supplier order: {supplier_order_id})")
 
             else:
                 # Handle failure
                 if retry_count < MAX_RETRIES - 1:
                     # Retry
-                    order.status = OrderStatus.RETRYING
-                    order.updated_at = datetime.utcnow()
-
-                    if not order.meta:
-                        order.meta = {}
-                    order.meta['last_retry_at'] = datetime.utcnow().isoformat()
-                    order.meta['retry_count'] = retry_count + 1
+                    _update_order(
+                        db, order.id,
+                        {
+                            'last_retry_at': now_iso,
+                            'retry_count': retry_count + 1,
+                            'supplier_job_id': None,
+                            'supplier_job_claimed_at': None
+                        },
+                        status=OrderStatus.RETRYING,
+                        updated_at=now
+                    )
 
                     # Create audit log
                     audit = AuditLog(
@@ -95,32 +175,34 @@ def execute_purchase_job(order_id: str, job_id: str, retry_count: int = 0):
                         }
                     )
                     db.add(audit)
-                    db.commit()
 
                     logger.warning(f"⚠️ [Job {job_id}] Purchase failed for order {order_id}, scheduling retry {retry_count + 2}/{MAX_RETRIES} in {RETRY_DELAY_SECONDS}s")
 
-                    # Schedule retry
-                    from workers.scheduler import add_job
-                    from datetime import timedelta
-                    retry_time = datetime.utcnow() + timedelta(seconds=RETRY_DELAY_SECONDS)
-                    add_job(
-                        func=execute_purchase_job,
-                        job_id=f"{job_id}-retry-{retry_count + 1}",
-                        run_date=retry_time,
-                        order_id=order_id,
-                        retry_count=retry_count + 1
-                    )
+                    # Schedule retry (staged, submitted after commit)
+                    retry_time = now + timedelta(seconds=RETRY_DELAY_SECONDS)
+                    db.info.setdefault('pending_schedule', []).append({
+                        'func': execute_purchase_job,
+                        'job_id': _purchase_job_id(order_id, retry_count + 1),
+                        'run_date': retry_time,
+                        'max_instances': 1,
+                        'order_id': order_id,
+                        'retry_count': retry_count + 1
+                    })
 
                 else:
                     # Max retries reached, move to manual review
-                    order.status = OrderStatus.MANUAL_REVIEW
-                    order.updated_at = datetime.utcnow()
-
-                    if not order.meta:
-                        order.meta = {}
-                    order.meta['failure_reason'] = 'Max retries reached for purchase execution'
-                    order.meta['failed_at'] = datetime.utcnow().isoformat()
-                    order.meta['total_attempts'] = retry_count + 1
+                    _update_order(
+                        db, order.id,
+                        {
+                            'failure_reason': 'Max retries reached for purchase execution',
+                            'failed_at': now_iso,
+                            'total_attempts': retry_count + 1,
+                            'supplier_job_id': None,
+                            'supplier_job_claimed_at': None
+                        },
+                        status=OrderStatus.MANUAL_REVIEW,
+                        updated_at=now
+                    )
 
                     # Create audit log
                     audit = AuditLog(
@@ -134,30 +216,132 @@ def execute_purchase_job(order_id: str, job_id: str, retry_count: int = 0):
                         }
                     )
                     db.add(audit)
-                    db.commit()
+
+                    # Publish to the dead-letter queue for manual handling
+                    _dead_letter_order(db, order.id, job_id, retry_count + 1, 'Max retries reached')
 
                     logger.error(f"❌ [Job {job_id}] Purchase failed for order {order_id} after {retry_count + 1} attempts, moved to MANUAL_REVIEW")
 
-    except Exception as e:
-        logger.error(f"❌ [Job {job_id}] Exception in purchase job for order {order_id}: {str(e)}")
-        # Try to update order status
-        try:
-            with get_db() as db:
-                order = db.query(Order).filter(Order.id == order_id).first()
-                if order:
-                    order.status = OrderStatus.FAILED
-                    order.updated_at = datetime.utcnow()
-                    if not order.meta:
-                        order.meta = {}
-                    order.meta['failure_reason'] = f'Exception: {str(e)}'
-                    db.commit()
-        except:
-            pass
-
-
-def _call_supplier_api(order: Order, job_id: str, retry_count: int) -> bool:
+            # Single commit for order update + audit log
+            db.commit()
+
+            # Submit staged jobs only once the state change is committed
+            for job in db.info.pop('pending_schedule', []):
+                if not add_job(**job):
+                    raise RuntimeError(f"Failed to schedule job {job['job_id']}")
+
+        except Exception as e:
+            db.info.pop('pending_schedule', None)
+            logger.error(f"❌ [Job {job_id}] Exception in purchase job for order {order_id}: {str(e)}")
+            _mark_order_failed(db, order_id, e)
+
+
+def _claim_order(db, order_id: str, in_flight_job_id: str = None):
+    """
+    Lock the order for this job
+
+    Without in_flight_job_id (submitting): the order must be waiting for a supplier
+    order (SUPPLIER_ORDERING, or RETRYING for a retry) with no request in flight,
+    or with one claimed more than STALE_CLAIM_SECONDS ago (its job was lost).
+    With in_flight_job_id (handling the response): the order must be SUPPLIER_ORDERING
+    with that job's request in flight (meta.supplier_job_id).
+
+    SKIP LOCKED: returns None instead of waiting when another worker holds the row
+    """
+    supplier_job_id = Order.meta['supplier_job_id'].astext
+
+    query = db.query(Order).filter(Order.id == order_id)
+    if in_flight_job_id is None:
+        # Claims made before the timestamp was recorded fall back to updated_at
+        claimed_at = func.coalesce(
+            cast(Order.meta['supplier_job_claimed_at'].astext, DateTime(timezone=True)),
+            Order.updated_at
+        )
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=STALE_CLAIM_SECONDS)
+        query = query.filter(
+            Order.status.in_([OrderStatus.SUPPLIER_ORDERING, OrderStatus.RETRYING]),
+            or_(supplier_job_id.is_(None), claimed_at < stale_before)
+        )
+    else:
+        query = query.filter(
+            Order.status == OrderStatus.SUPPLIER_ORDERING,
+            supplier_job_id == in_flight_job_id
+        )
+
+    return query.with_for_update(skip_locked=True).first()
+
+
+def _merged_meta(meta_updates: dict):
+    """SQL expression merging meta_updates into the existing JSONB meta column"""
+    return func.coalesce(Order.meta, cast({}, JSONB)).op('||')(cast(meta_updates, JSONB))
+
+
+def _update_order(db, order_id, meta_updates: dict, **values):
+    """Update order columns and merge meta_updates server-side in a single UPDATE"""
+    db.execute(
+        update(Order)
+        .where(Order.id == order_id)
+        .values(meta=_merged_meta(meta_updates), **values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _dead_letter_order(db, order_id, job_id: str, attempts: int, reason: str):
+    """
+    Record an exhausted purchase job in dead_letter_orders
+    An order already waiting there unresolved gets its entry refreshed; once
+    resolved, a later exhaustion opens a new entry
     """
-    Simulate supplier API call
+    stmt = pg_insert(DeadLetterOrder).values(
+        order_id=order_id,
+        job_type='purchase',
+        job_id=job_id,
+        attempts=attempts,
+        reason=reason
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=['order_id', 'job_type'],
+            index_where=DeadLetterOrder.resolved_at.is_(None),
+            set_={
+                'job_id': stmt.excluded.job_id,
+                'attempts': stmt.excluded.attempts,
+                'reason': stmt.excluded.reason
+            }
+        )
+    )
+
+
+def _mark_order_failed(db, order_id: str, error: Exception):
+    """Move order to FAILED after an unexpected exception, reusing the job's session"""
+    try:
+        db.rollback()
+        _update_order(
+            db, order_id,
+            {'failure_reason': f'Exception: {str(error)}', 'supplier_job_id': None, 'supplier_job_claimed_at': None},
+            status=OrderStatus.FAILED,
+            updated_at=datetime.utcnow()
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+
+
+def _submit_supplier_request(order: Order, job_id: str):
+    """
+    Simulate submitting the order to the supplier (returns immediately)
+    TODO: Replace with actual supplier API integration in Phase 6
+
+    Args:
+        order: Order object
+        job_id: Job identifier
+    """
+    logger.info(f"📤 [Job {job_id}] Supplier order submitted (simulated) for order {order.id}")
+
+
+def _receive_supplier_response(order: Order, job_id: str, retry_count: int) -> bool:
+    """
+    Simulate the supplier's response to a submitted order
     TODO: Replace with actual supplier API integration in Phase 6
 
     Args:
@@ -169,11 +353,7 @@ def _call_supplier_api(order: Order, job_id: str, retry_count: int) -> bool:
         bool: True if successful, False if failed
     """
     try:
-        # Simulate API call delay
-        time.sleep(2)
-
         # Simulate 90% success rate (10% failure for testing retry logic)
-        import random
         success_rate = 0.9 if retry_count == 0 else 0.95  # Higher success on retries
 
         if random.random() < success_rate:
@@ -186,3 +366,4 @@ def _call_supplier_api(order: Order, job_id: str, retry_count: int) -> bool:
     except Exception as e:
         logger.error(f"❌ [Job {job_id}] Supplier API call exception: {str(e)}")
         return False
+
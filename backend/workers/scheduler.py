@@ -2,6 +2,7 @@
 Background job scheduler using APScheduler
 Manages purchase and forwarder worker jobs
 """
+import os
 import logging
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.memory import MemoryJobStore
@@ -13,20 +14,29 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Job stores configuration
+# In-memory and per-process: every gunicorn worker runs its own scheduler, and
+# APScheduler 3.x does not support sharing a persistent job store between
+# processes (jobs could run twice or be lost)
 jobstores = {
     'default': MemoryJobStore()
 }
 
 # Executors configuration
+# - default: I/O-bound jobs (DB + external APIs), threads scale with cores
+# - cpu: CPU-bound jobs, leave one core for the web workers
+IO_WORKERS = int(os.getenv('SCHED_IO_WORKERS', min(32, (os.cpu_count() or 4) * 5)))
+CPU_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
 executors = {
-    'default': ThreadPoolExecutor(max_workers=10)
+    'default': ThreadPoolExecutor(max_workers=IO_WORKERS),
+    'cpu': ThreadPoolExecutor(max_workers=CPU_WORKERS)
 }
 
 # Job defaults
 job_defaults = {
-    'coalesce': False,
+    'coalesce': True,  # Collapse missed runs of the same (idempotent) job into one
     'max_instances': 3,
-    'misfire_grace_time': 30
+    'misfire_grace_time': 300
 }
 
 # Create scheduler instance
@@ -96,14 +106,16 @@ def shutdown_scheduler():
         return False
 
 
-def add_job(func, job_id, run_date=None, **kwargs):
+def add_job(func, job_id, run_date=None, executor='default', max_instances=None, **kwargs):
     """
     Add a one-time job to the scheduler
 
     Args:
         func: Function to execute
-        job_id: Unique job identifier
+        job_id: Unique job identifier (re-adding the same id replaces the pending job)
         run_date: When to run the job (datetime object or None for immediate)
+        executor: 'default' for I/O-bound jobs, 'cpu' for CPU-bound jobs
+        max_instances: Override job_defaults max_instances (e.g. 1 for per-order jobs)
         **kwargs: Additional arguments to pass to the function
     """
     try:
@@ -112,13 +124,19 @@ def add_job(func, job_id, run_date=None, **kwargs):
             from datetime import timedelta
             run_date = datetime.utcnow() + timedelta(seconds=1)
 
+        job_options = {}
+        if max_instances is not None:
+            job_options['max_instances'] = max_instances
+
         scheduler.add_job(
             func=func,
             trigger='date',
             run_date=run_date,
             id=job_id,
             kwargs=kwargs,
-            replace_existing=True
+            executor=executor,
+            replace_existing=True,
+            **job_options
         )
 
         logger.info(f"✅ Job {job_id} scheduled for {run_date}")
@@ -2,16 +2,28 @@
 SmartStore Order Sync Worker
 Syncs orders from Naver SmartStore and sends TalkTalk messages
 """
+import os
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import List, Dict
+from functools import lru_cache
+from itertools import islice
+from typing import List, Dict, Iterator
+
+from sqlalchemy import update, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from models import get_db, SmartStoreOrder, SmartStoreOrderStatus, TalkTalkStatus
-from connectors.naver_commerce_api import get_naver_commerce_api
-from connectors.naver_talktalk_api import NaverTalkTalkAPI
 
 logger = logging.getLogger(__name__)
 
+# Concurrent TalkTalk sends per sync run
+TALKTALK_WORKERS = int(os.getenv('TALKTALK_WORKERS', '8'))
+
+# SmartStore API page size, and orders saved/messaged per commit
+ORDERS_PAGE_SIZE = 200
+SYNC_CHUNK_SIZE = 50
+
 
 def sync_smartstore_orders():
     """
@@ -23,86 +35,34 @@ def sync_smartstore_orders():
     try:
         logger.info("🔄 Starting SmartStore order sync...")
 
-        # Initialize APIs
-        naver_api = get_naver_commerce_api()
-        talktalk_api = NaverTalkTalkAPI()
+        # Initialize APIs (reused across sync runs)
+        naver_api, talktalk_api = _get_api_clients()
 
         # Fetch orders from last 7 days
-        start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-        end_date = datetime.now().strftime('%Y-%m-%d')
+        now = datetime.now()
+        start_date = (now - timedelta(days=7)).strftime('%Y-%m-%d')
+        end_date = now.strftime('%Y-%m-%d')
 
-        # Get orders from SmartStore API
+        # Get orders from SmartStore API page by page
         # Note: This is a placeholder - actual Naver Commerce API endpoint needs to be implemented
-        orders_data = fetch_orders_from_smartstore(naver_api, start_date, end_date)
+        orders_iter = iter_smartstore_orders(naver_api, start_date, end_date)
 
         new_orders_count = 0
         messages_sent_count = 0
 
         with get_db() as db:
-            for order_data in orders_data:
-                smartstore_order_id = order_data.get('order_id')
-
-                # Check if order already exists
-                existing_order = db.query(SmartStoreOrder).filter(
-                    SmartStoreOrder.smartstore_order_id == smartstore_order_id
-                ).first()
-
-                if existing_order:
-                    logger.debug(f"Order {smartstore_order_id} already exists, skipping...")
-                    continue
-
-                # Create new order
-                new_order = SmartStoreOrder(
-                    smartstore_order_id=smartstore_order_id,
-                    order_date=datetime.fromisoformat(order_data.get('order_date')),
-                    product_name=order_data.get('product_name'),
-                    product_option=order_data.get('product_option'),
-                    quantity=order_data.get('quantity', 1),
-                    payment_amount=order_data.get('payment_amount'),
-                    buyer_name=order_data.get('buyer_name'),
-                    buyer_phone=order_data.get('buyer_phone'),
-                    shipping_address=order_data.get('shipping_address'),
-                    shipping_zipcode=order_data.get('shipping_zipcode'),
-                    shipping_message=order_data.get('shipping_message'),
-                    order_status=SmartStoreOrderStatus.NEW,
-                    talktalk_status=TalkTalkStatus.NOT_SENT,
-                    meta=order_data  # Store full API response
-                )
-
-                db.add(new_order)
-                db.flush()  # Get the ID
-
-                logger.info(f"✅ New order saved: {smartstore_order_id}")
-                new_orders_count += 1
-
-                # Send TalkTalk message for customs ID request
-                try:
-                    result = talktalk_api.send_customs_id_request(
-                        buyer_phone=new_order.buyer_phone,
-                        buyer_name=new_order.buyer_name,
-                        order_id=smartstore_order_id,
-                        product_name=new_order.product_name
-                    )
-
-                    if result.get('success'):
-                        # Update order with TalkTalk info
-                        new_order.talktalk_status = TalkTalkStatus.SENT
-                        new_order.talktalk_message_id = result.get('message_id')
-                        new_order.talktalk_sent_at = datetime.now()
-                        new_order.order_status = SmartStoreOrderStatus.CUSTOMS_ID_REQUESTED
-
-                        logger.info(f"✅ TalkTalk message sent for order {smartstore_order_id}")
-                        messages_sent_count += 1
-                    else:
-                        new_order.talktalk_status = TalkTalkStatus.FAILED
-                        logger.error(f"❌ Failed to send TalkTalk message: {result.get('error')}")
-
-                except Exception as e:
-                    logger.error(f"❌ Error sending TalkTalk message: {str(e)}")
-                    new_order.talktalk_status = TalkTalkStatus.FAILED
-
-            # Commit all changes
-            db.commit()
+            # Messages a previous run could not send (TalkTalk circuit breaker open)
+            messages_sent_count += _resend_pending_messages(db, talktalk_api)
+
+            # Process in fixed-size chunks, committing each, so memory stays flat
+            while True:
+                chunk = list(islice(orders_iter, SYNC_CHUNK_SIZE))
+                if not chunk:
+                    break
+
+                inserted, sent = _sync_order_chunk(db, talktalk_api, chunk)
+                new_orders_count += inserted
+                messages_sent_count += sent
 
         logger.info(f"✅ Order sync completed: {new_orders_count} new orders, {messages_sent_count} messages sent")
 
@@ -120,78 +80,244 @@ def sync_smartstore_orders():
         }
 
 
-def fetch_orders_from_smartstore(naver_api, start_date: str, end_date: str) -> List[Dict]:
+@lru_cache(maxsize=1)
+def _get_api_clients():
+    """
+    Build the SmartStore/TalkTalk clients once per process
+    Connectors are imported here so loading this module (e.g. by the scheduler)
+    doesn't pull in the HTTP/crypto stack; the clients keep their token and
+    connection pool between sync runs
+    """
+    from connectors.naver_commerce_api import get_naver_commerce_api
+    from connectors.naver_talktalk_api import NaverTalkTalkAPI
+
+    return get_naver_commerce_api(), NaverTalkTalkAPI()
+
+
+def _sync_order_chunk(db, talktalk_api, orders_data: List[Dict]) -> tuple:
+    """
+    Save one chunk of parsed orders and send TalkTalk messages for the new ones
+
+    Returns:
+        tuple: (new_orders_count, messages_sent_count)
+    """
+    rows = [
+        {
+            'smartstore_order_id': order_data.get('order_id'),
+            'order_date': datetime.fromisoformat(order_data.get('order_date')),
+            'product_name': order_data.get('product_name'),
+            'product_option': order_data.get('product_option'),
+            'quantity': order_data.get('quantity', 1),
+            'payment_amount': order_data.get('payment_amount'),
+            'buyer_name': order_data.get('buyer_name'),
+            'buyer_phone': order_data.get('buyer_phone'),
+            'shipping_address': order_data.get('shipping_address'),
+            'shipping_zipcode': order_data.get('shipping_zipcode'),
+            'shipping_message': order_data.get('shipping_message'),
+            'order_status': SmartStoreOrderStatus.NEW,
+            'talktalk_status': TalkTalkStatus.NOT_SENT,
+            'meta': order_data  # Store full API response
+        }
+        for order_data in orders_data
+    ]
+
+    # Insert all orders in one statement; already-synced orders are skipped
+    # by the unique smartstore_order_id, only really new rows come back
+    new_orders = []
+    if rows:
+        new_orders = db.execute(
+            pg_insert(SmartStoreOrder)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=['smartstore_order_id'])
+            .returning(
+                SmartStoreOrder.id,
+                SmartStoreOrder.smartstore_order_id,
+                SmartStoreOrder.buyer_phone,
+                SmartStoreOrder.buyer_name,
+                SmartStoreOrder.product_name
+            )
+        ).all()
+    db.commit()
+
+    logger.info(f"✅ {len(new_orders)} new orders saved ({len(rows) - len(new_orders)} already synced)")
+
+    # Send TalkTalk messages for customs ID request (after orders are safely committed)
+    messages_sent_count = _send_customs_id_requests(db, talktalk_api, new_orders)
+
+    return len(new_orders), messages_sent_count
+
+
+def _resend_pending_messages(db, talktalk_api) -> int:
+    """
+    Retry customs ID requests left NOT_SENT by an earlier run (e.g. circuit breaker open)
+
+    Returns:
+        Number of messages sent
+    """
+    pending_orders = db.execute(
+        select(
+            SmartStoreOrder.id,
+            SmartStoreOrder.smartstore_order_id,
+            SmartStoreOrder.buyer_phone,
+            SmartStoreOrder.buyer_name,
+            SmartStoreOrder.product_name
+        ).where(
+            SmartStoreOrder.order_status == SmartStoreOrderStatus.NEW,
+            SmartStoreOrder.talktalk_status == TalkTalkStatus.NOT_SENT
+        )
+    ).all()
+
+    if pending_orders:
+        logger.info(f"🔁 Retrying {len(pending_orders)} pending TalkTalk messages")
+
+    return _send_customs_id_requests(db, talktalk_api, pending_orders)
+
+
+def _send_customs_id_requests(db, talktalk_api, orders) -> int:
+    """
+    Send customs ID requests concurrently and record their TalkTalk status
+
+    Returns:
+        Number of messages sent
+    """
+    # Each send is independent network I/O, so dispatch them concurrently
+    talktalk_updates = []
+    messages_sent_count = 0
+    if orders:
+        with ThreadPoolExecutor(max_workers=min(TALKTALK_WORKERS, len(orders))) as executor:
+            futures = [
+                executor.submit(_send_customs_id_request, talktalk_api, order)
+                for order in orders
+            ]
+            for future in as_completed(futures):
+                talktalk_update = future.result()
+                if talktalk_update is None:
+                    continue  # Left NOT_SENT, retried next cycle
+                talktalk_updates.append(talktalk_update)
+                if talktalk_update['talktalk_status'] == TalkTalkStatus.SENT:
+                    messages_sent_count += 1
+
+    # Apply all TalkTalk status updates in one transaction (bulk UPDATE by primary key)
+    if talktalk_updates:
+        db.execute(update(SmartStoreOrder), talktalk_updates)
+    db.commit()
+
+    return messages_sent_count
+
+
+def _send_customs_id_request(talktalk_api, new_order) -> Dict:
     """
-    Fetch orders from Naver SmartStore API
+    Send customs ID request for one order (runs on a worker thread)
+
+    Args:
+        talktalk_api: TalkTalk API client
+        new_order: Inserted order row (id, smartstore_order_id, buyer/product fields)
+
+    Returns:
+        Bulk UPDATE mapping for the order's TalkTalk status,
+        or None when the circuit breaker is open (order stays NOT_SENT)
+    """
+    try:
+        result = talktalk_api.send_customs_id_request(
+            buyer_phone=new_order.buyer_phone,
+            buyer_name=new_order.buyer_name,
+            order_id=new_order.smartstore_order_id,
+            product_name=new_order.product_name
+        )
+
+        if result.get('success'):
+            logger.info(f"✅ TalkTalk message sent for order {new_order.smartstore_order_id}")
+
+            # Update order with TalkTalk info
+            return {
+                'id': new_order.id,
+                'talktalk_status': TalkTalkStatus.SENT,
+                'talktalk_message_id': result.get('message_id'),
+                'talktalk_sent_at': datetime.now(),
+                'order_status': SmartStoreOrderStatus.CUSTOMS_ID_REQUESTED
+            }
+
+        if result.get('circuit_open'):
+            return None
+
+        logger.error(f"❌ Failed to send TalkTalk message: {result.get('error')}")
+
+    except Exception as e:
+        logger.error(f"❌ Error sending TalkTalk message: {str(e)}")
+
+    return {'id': new_order.id, 'talktalk_status': TalkTalkStatus.FAILED}
+
+
+def iter_smartstore_orders(naver_api, start_date: str, end_date: str) -> Iterator[Dict]:
+    """
+    Fetch orders from Naver SmartStore API, yielding parsed orders page by page
 
     Args:
         naver_api: Naver Commerce API client
         start_date: Start date (YYYY-MM-DD)
         end_date: End date (YYYY-MM-DD)
 
-    Returns:
-        List of order data dictionaries
+    Yields:
+        Parsed order data dictionaries
     """
-    try:
-        # Naver Commerce API endpoint for orders
-        endpoint = '/v1/orders'
+    # Naver Commerce API endpoint for orders
+    endpoint = '/v1/orders'
+    page = 1
+
+    while True:
         params = {
             'searchDateType': 'ORDER_DATE',
             'searchStartDate': start_date,
             'searchEndDate': end_date,
-            'pageNumber': 1,
-            'pageSize': 100
+            'pageNumber': page,
+            'pageSize': ORDERS_PAGE_SIZE
         }
 
-        response = naver_api._make_request('GET', endpoint, params=params)
+        try:
+            response = naver_api._make_request('GET', endpoint, params=params)
+        except Exception as e:
+            logger.error(f"❌ Failed to fetch orders from SmartStore (page {page}): {str(e)}")
+            return
 
-        if response.get('data'):
-            orders = response['data'].get('orders', [])
-            logger.info(f"📦 Fetched {len(orders)} orders from SmartStore")
-            return parse_smartstore_orders(orders)
-        else:
-            logger.warning("⚠️ No orders data in response")
-            return []
+        if not response.get('data'):
+            if page == 1:
+                logger.warning("⚠️ No orders data in response")
+            return
 
-    except Exception as e:
-        logger.error(f"❌ Failed to fetch orders from SmartStore: {str(e)}")
-        return []
+        orders = response['data'].get('orders', [])
+        logger.info(f"📦 Fetched {len(orders)} orders from SmartStore (page {page})")
+
+        yield from parse_smartstore_orders(orders)
+
+        # Last page reached
+        if len(orders) < ORDERS_PAGE_SIZE:
+            return
+        page += 1
 
 
-def parse_smartstore_orders(orders: List[Dict]) -> List[Dict]:
+def parse_smartstore_orders(orders: List[Dict]) -> Iterator[Dict]:
     """
     Parse SmartStore API order response to our format
 
     Args:
         orders: Raw orders from SmartStore API
 
-    Returns:
-        Parsed orders list
+    Yields:
+        Parsed order dictionaries
     """
-    parsed_orders = []
-
     for order in orders:
-        try:
-            # Extract order information from SmartStore API response
-            # Note: Field names may vary based on actual API response structure
-            parsed_order = {
-                'order_id': order.get('orderId') or order.get('productOrderId'),
-                'order_date': order.get('orderDate') or order.get('paymentDate'),
-                'product_name': order.get('productName'),
-                'product_option': order.get('productOption'),
-                'quantity': order.get('quantity', 1),
-                'payment_amount': order.get('paymentAmount') or order.get('totalPaymentAmount'),
-                'buyer_name': order.get('ordererName') or order.get('receiverName'),
-                'buyer_phone': order.get('ordererTel') or order.get('receiverTel1'),
-                'shipping_address': f"{order.get('receiverAddress1', '')} {order.get('receiverAddress2', '')}".strip(),
-                'shipping_zipcode': order.get('receiverZipCode'),
-                'shipping_message': order.get('deliveryMessage') or order.get('giftMessage'),
-            }
-
-            parsed_orders.append(parsed_order)
-
-        except Exception as e:
-            logger.error(f"❌ Error parsing order: {str(e)}")
-            continue
-
-    return parsed_orders
+        # Extract order information from SmartStore API response
+        # Note: Field names may vary based on actual API response structure
+        yield {
+            'order_id': order.get('orderId') or order.get('productOrderId'),
+            'order_date': order.get('orderDate') or order.get('paymentDate'),
+            'product_name': order.get('productName'),
+            'product_option': order.get('productOption'),
+            'quantity': order.get('quantity', 1),
+            'payment_amount': order.get('paymentAmount') or order.get('totalPaymentAmount'),
+            'buyer_name': order.get('ordererName') or order.get('receiverName'),
+            'buyer_phone': order.get('ordererTel') or order.get('receiverTel1'),
+            'shipping_address': f"{order.get('receiverAddress1', '')} {order.get('receiverAddress2', '')}".strip(),
+            'shipping_zipcode': order.get('receiverZipCode'),
+            'shipping_message': order.get('deliveryMessage') or order.get('giftMessage'),
+        }
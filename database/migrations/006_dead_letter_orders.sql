@@ -0,0 +1,23 @@
+-- Migration: Dead-letter queue for purchase jobs
+-- Description: Orders whose purchase job exhausted its retries, kept for manual review
+
+CREATE TABLE IF NOT EXISTS dead_letter_orders (
+  id BIGSERIAL PRIMARY KEY,
+  order_id UUID NOT NULL REFERENCES orders(id) ON DELETE CASCADE,
+  job_type TEXT NOT NULL,                         -- 'purchase', 'forwarder'
+  job_id TEXT,
+  attempts INTEGER NOT NULL,
+  reason TEXT,
+  meta JSONB DEFAULT '{}'::JSONB,
+  resolved_at TIMESTAMPTZ,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE (order_id, job_type)
+);
+
+-- Unresolved entries (manual review queue)
+CREATE INDEX IF NOT EXISTS idx_dead_letter_orders_unresolved ON dead_letter_orders(created_at DESC)
+  WHERE resolved_at IS NULL;
+
+-- Comments
+COMMENT ON TABLE dead_letter_orders IS 'Orders whose background job exhausted its retries';
+COMMENT ON COLUMN dead_letter_orders.resolved_at IS 'Set when an operator has handled the order';
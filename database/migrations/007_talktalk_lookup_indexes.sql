@@ -0,0 +1,17 @@
+-- Migration: Indexes for TalkTalk customs ID lookups
+-- Description: Partial composite index for the TalkTalk webhook's pending-order lookup,
+-- composite index for the SmartStore orders list filtered by TalkTalk status
+-- Note: CONCURRENTLY avoids blocking order writes; run this file outside a transaction (psql \i)
+
+-- Latest SENT order still waiting on a customs ID for a buyer (TalkTalk webhook)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_smartstore_orders_talktalk_lookup
+  ON smartstore_orders(buyer_phone, talktalk_status, created_at DESC)
+  WHERE customs_id IS NULL;
+
+-- SmartStore orders list filtered by TalkTalk status, newest first
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_smartstore_orders_talktalk_created
+  ON smartstore_orders(talktalk_status, created_at DESC);
+
+-- Comments
+COMMENT ON INDEX idx_smartstore_orders_talktalk_lookup IS 'TalkTalk webhook pending customs ID lookup';
+COMMENT ON INDEX idx_smartstore_orders_talktalk_created IS 'SmartStore orders list by TalkTalk status';
@@ -0,0 +1,13 @@
+-- Migration: One unresolved dead-letter entry per order and job type
+-- Description: Replaces UNIQUE (order_id, job_type) with a partial unique index on unresolved
+-- entries, so an order that exhausts its retries again after being resolved gets a new entry
+
+ALTER TABLE dead_letter_orders DROP CONSTRAINT IF EXISTS dead_letter_orders_order_id_job_type_key;
+
+-- At most one open entry per order and job type (upsert target for the workers)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_dead_letter_orders_unresolved
+  ON dead_letter_orders(order_id, job_type)
+  WHERE resolved_at IS NULL;
+
+-- Comments
+COMMENT ON INDEX uq_dead_letter_orders_unresolved IS 'One unresolved dead-letter entry per order and job type';
@@ -88,6 +88,7 @@ def internal_error(error):
         }
     }), 500
 
+# Development server only - production runs under gunicorn gthread workers (see Procfile)
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5001))
     debug = os.getenv('FLASK_ENV') == 'development'
@@ -3,17 +3,33 @@ Analytics Routes
 Main API endpoints for product analysis
 """
 import logging
-from flask import Blueprint, request, jsonify
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, request, jsonify, Response
 from typing import Dict, Any
 
 from services.naver_search_ad_api import get_naver_search_ad_api
 from services.naver_shopping_api import get_naver_shopping_api
 from services.revenue_estimator import get_revenue_estimator
+from services.response_cache import get_response_cache
 
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('analytics', __name__)
 
+# Shared pool for overlapping independent Naver API calls within a request
+_api_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='naver-api')
+
+# Response cache TTLs (keyword stats change slowly)
+ANALYZE_CACHE_TTL = 300
+SEARCH_VOLUME_CACHE_TTL = 600
+PRICE_DISTRIBUTION_CACHE_TTL = 600
+
+
+def _json(payload: dict, status: int = 200) -> Response:
+    """Serialize large analysis responses with orjson"""
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
 
 @bp.route('/analyze', methods=['POST'])
 def analyze_product():
@@ -36,16 +52,32 @@ def analyze_product():
                 }
             }), 400
 
-        logger.info(f"🔍 Analyzing keyword: {keyword}")
+        logger.info("🔍 Analyzing keyword: %s", keyword)
+
+        cache = get_response_cache()
+        cache_key = f"analyze:{keyword}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info("⚡ Analysis cache hit for '%s'", keyword)
+            return _json({
+                'ok': True,
+                'data': cached
+            })
 
         # Initialize services
         search_ad_api = get_naver_search_ad_api()
         shopping_api = get_naver_shopping_api()
         estimator = get_revenue_estimator()
 
+        # Search Ad and Shopping APIs are independent - run both calls concurrently
+        keyword_stats_future = _api_executor.submit(search_ad_api.get_keyword_stats, [keyword])
+        price_dist_future = _api_executor.submit(shopping_api.get_price_distribution, keyword, max_products=100)
+
+        used_mock_data = False
+
         # 1. Get search volume from Search Ad API
         try:
-            keyword_stats = search_ad_api.get_keyword_stats([keyword])
+            keyword_stats = keyword_stats_future.result()
             if not keyword_stats:
                 raise ValueError("No search volume data available")
 
@@ -54,7 +86,8 @@ def analyze_product():
             competition_index = stats['competition']['level']
 
         except Exception as e:
-            logger.warning(f"⚠️ Search Ad API failed, using mock data: {str(e)}")
+            logger.warning("⚠️ Search Ad API failed, using mock data: %s", e)
+            used_mock_data = True
             # Fallback to mock data
             search_volume_data = {
                 'total': 80600,
@@ -65,12 +98,13 @@ def analyze_product():
 
         # 2. Get price distribution from Shopping API
         try:
-            price_dist = shopping_api.get_price_distribution(keyword, max_products=100)
+            price_dist = price_dist_future.result()
             avg_price = price_dist['avg_price']
             product_count = price_dist['total_products']
 
         except Exception as e:
-            logger.warning(f"⚠️ Shopping API failed, using mock data: {str(e)}")
+            logger.warning("⚠️ Shopping API failed, using mock data: %s", e)
+            used_mock_data = True
             # Fallback to mock data
             price_dist = {
                 'ranges': ['1-2만', '2-3만', '3-4만', '4-5만', '5-6만', '6-7만', '7-8만', '8-9만', '9-10만', '10만+'],
@@ -127,9 +161,13 @@ def analyze_product():
             }
         }
 
-        logger.info(f"✅ Analysis complete for '{keyword}'")
+        logger.info("✅ Analysis complete for '%s'", keyword)
 
-        return jsonify({
+        # Only cache real API data, never the mock fallback
+        if not used_mock_data:
+            cache.set(cache_key, response_data, ANALYZE_CACHE_TTL)
+
+        return _json({
             'ok': True,
             'data': response_data
         })
@@ -161,6 +199,15 @@ def get_search_volume():
                 }
             }), 400
 
+        cache = get_response_cache()
+        cache_key = f"sv:{keyword}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return jsonify({
+                'ok': True,
+                'data': cached
+            })
+
         search_ad_api = get_naver_search_ad_api()
         stats = search_ad_api.get_keyword_stats([keyword])
 
@@ -173,6 +220,8 @@ def get_search_volume():
                 }
             }), 404
 
+        cache.set(cache_key, stats[0], SEARCH_VOLUME_CACHE_TTL)
+
         return jsonify({
             'ok': True,
             'data': stats[0]
@@ -205,8 +254,18 @@ def get_price_distribution():
                 }
             }), 400
 
+        cache = get_response_cache()
+        cache_key = f"pd:{keyword}:{max_products}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return jsonify({
+                'ok': True,
+                'data': cached
+            })
+
         shopping_api = get_naver_shopping_api()
         distribution = shopping_api.get_price_distribution(keyword, max_products)
+        cache.set(cache_key, distribution, PRICE_DISTRIBUTION_CACHE_TTL)
 
         return jsonify({
             'ok': True,
@@ -339,18 +339,17 @@ export async function getSmartStoreOrders(params?: {
   status?: string
   talktalk_status?: string
   limit?: number
-  offset?: number
+  cursor?: string
 }): Promise<ApiResponse<{
   orders: any[]
-  total: number
   limit: number
-  offset: number
+  next_cursor: string | null
 }>> {
   const searchParams = new URLSearchParams()
   if (params?.status) searchParams.set('status', params.status)
   if (params?.talktalk_status) searchParams.set('talktalk_status', params.talktalk_status)
   if (params?.limit) searchParams.set('limit', params.limit.toString())
-  if (params?.offset) searchParams.set('offset', params.offset.toString())
+  if (params?.cursor) searchParams.set('cursor', params.cursor)
 
   const query = searchParams.toString()
   return apiFetch(`/api/v1/smartstore/orders${query ? `?${query}` : ''}`)
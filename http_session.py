@@ -0,0 +1,26 @@
+"""Shared HTTP session for the endpoint test scripts"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connection failures are retried for every method (nothing reached the server).
+# Read timeouts and 5xx responses are retried for GET only: the POST endpoints
+# (e.g. /smartstore/register-products) create real SmartStore products, so a
+# slow response must not be resent.
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    backoff_jitter=0.5,
+    status_forcelist=(408, 429, 500, 502, 503, 504),
+    allowed_methods=frozenset(['GET']),
+    respect_retry_after_header=True
+)
+
+
+def make_session() -> requests.Session:
+    """Keep-alive session with exponential backoff + jitter retries"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=_RETRY)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
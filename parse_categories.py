@@ -2,8 +2,11 @@
 """
 Parse Naver SmartStore category data from text format to JSON
 """
+import io
 import json
 
+import pandas as pd
+
 # 카테고리 원본 데이터 (사용자가 제공한 데이터)
 category_text = """50003307	가구/인테리어	DIY자재/용품	가구부속품	가구다리
 50003308	가구/인테리어	DIY자재/용품	가구부속품	가구바퀴
@@ -18,44 +21,36 @@ full_data = """카테고리코드	대분류	중분류	소분류	세분류
 def parse_categories(data_text):
     """
     Parse category data from tab-separated text to structured JSON
+    Parsed in one pass by pandas' C reader, path columns built column-wise
     """
-    lines = data_text.strip().split('\n')
-
-    categories = []
-
-    for line in lines[1:]:  # Skip header row
-        if not line.strip():
-            continue
-
-        parts = line.split('\t')
-        if len(parts) < 2:
-            continue
-
-        category_id = parts[0].strip()
-
-        # Build category path from available columns
-        path_parts = []
-        for i in range(1, len(parts)):
-            if parts[i].strip():
-                path_parts.append(parts[i].strip())
-
-        if not category_id or not path_parts:
-            continue
-
-        category_name = path_parts[-1]  # Last non-empty part is the actual category name
-        category_path = ' > '.join(path_parts)
-
-        categories.append({
-            'id': category_id,
-            'name': category_name,
-            'path': category_path,
-            'level_1': path_parts[0] if len(path_parts) > 0 else '',
-            'level_2': path_parts[1] if len(path_parts) > 1 else '',
-            'level_3': path_parts[2] if len(path_parts) > 2 else '',
-            'level_4': path_parts[3] if len(path_parts) > 3 else '',
-        })
-
-    return categories
+    # Missing trailing fields of short rows must be empty levels, never NaN
+    df = pd.read_csv(io.StringIO(data_text.strip()), sep='\t', dtype=str, keep_default_na=False).fillna('')
+
+    category_ids = df.iloc[:, 0].str.strip()
+    levels = df.iloc[:, 1:].apply(lambda column: column.str.strip())
+
+    # Join non-empty levels: collapse separators left by empty columns
+    paths = (
+        levels.agg(' > '.join, axis=1)
+        .str.replace(r'(?: > )+', ' > ', regex=True)
+        .str.replace(r'^ > | > $', '', regex=True)
+    )
+
+    valid = (category_ids != '') & (paths != '')
+    category_ids = category_ids[valid]
+    paths = paths[valid]
+
+    path_parts = paths.str.split(' > ', expand=True).reindex(columns=range(4)).fillna('')
+
+    return pd.DataFrame({
+        'id': category_ids,
+        'name': paths.str.rsplit(' > ', n=1).str[-1],  # Last non-empty part is the actual category name
+        'path': paths,
+        'level_1': path_parts[0],
+        'level_2': path_parts[1],
+        'level_3': path_parts[2],
+        'level_4': path_parts[3],
+    }).to_dict(orient='records')
 
 # Note: This script structure is ready, but we'll create the actual file
 # with the full category data directly in the next step
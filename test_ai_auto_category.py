@@ -1,6 +1,15 @@
 """Test AI auto-category registration endpoint"""
-import requests
-import json
+from http_session import make_session
+import orjson
+
+# Reuse one keep-alive connection across all test requests
+_SESSION = make_session()
+
+
+def _pretty(obj):
+    """Pretty-print JSON (orjson keeps non-ASCII as-is)"""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
 
 url = "http://98.94.199.189:8080/api/v1/smartstore/register-products"
 
@@ -17,12 +26,12 @@ payload1 = {
     }
 }
 
-print(f"Request: {json.dumps(payload1, indent=2, ensure_ascii=False)}\n")
+print(f"Request: {_pretty(payload1)}\n")
 
 try:
-    response1 = requests.post(url, json=payload1, timeout=30)
+    response1 = _SESSION.post(url, json=payload1, timeout=30)
     print(f"Status: {response1.status_code}")
-    print(f"Response:\n{json.dumps(response1.json(), indent=2, ensure_ascii=False)}\n")
+    print(f"Response:\n{_pretty(orjson.loads(response1.content))}\n")
 except Exception as e:
     print(f"❌ Error: {str(e)}\n")
 
@@ -40,12 +49,12 @@ payload2 = {
     }
 }
 
-print(f"Request: {json.dumps(payload2, indent=2, ensure_ascii=False)}\n")
+print(f"Request: {_pretty(payload2)}\n")
 
 try:
-    response2 = requests.post(url, json=payload2, timeout=30)
+    response2 = _SESSION.post(url, json=payload2, timeout=30)
     print(f"Status: {response2.status_code}")
-    print(f"Response:\n{json.dumps(response2.json(), indent=2, ensure_ascii=False)}\n")
+    print(f"Response:\n{_pretty(orjson.loads(response2.content))}\n")
 except Exception as e:
     print(f"❌ Error: {str(e)}\n")
 
@@ -62,11 +71,11 @@ payload3 = {
     }
 }
 
-print(f"Request: {json.dumps(payload3, indent=2, ensure_ascii=False)}\n")
+print(f"Request: {_pretty(payload3)}\n")
 
 try:
-    response3 = requests.post(url, json=payload3, timeout=30)
+    response3 = _SESSION.post(url, json=payload3, timeout=30)
     print(f"Status: {response3.status_code}")
-    print(f"Response:\n{json.dumps(response3.json(), indent=2, ensure_ascii=False)}\n")
+    print(f"Response:\n{_pretty(orjson.loads(response3.content))}\n")
 except Exception as e:
     print(f"❌ Error: {str(e)}\n")
@@ -1,6 +1,10 @@
 """Test tool category suggestions"""
-import requests
+from http_session import make_session
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+# Reuse one keep-alive connection across all test requests
+_SESSION = make_session()
 
 url = "http://98.94.199.189:8080/api/v1/smartstore/suggest-category"
 
@@ -11,14 +15,21 @@ test_products = [
     "원형톱 전기톱 목공용",
 ]
 
-for title in test_products:
+
+def suggest(title):
+    payload = {"product_data": {"title": title}}
+    return _SESSION.post(url, json=payload)
+
+
+# Requests are independent I/O - fire them all at once, print in input order
+with ThreadPoolExecutor(max_workers=len(test_products)) as executor:
+    responses = list(executor.map(suggest, test_products))
+
+for title, response in zip(test_products, responses):
     print(f"\n{'='*60}")
     print(f"🧪 Testing: {title}")
     print(f"{'='*60}")
 
-    payload = {"product_data": {"title": title}}
-    response = requests.post(url, json=payload)
-
     if response.status_code == 200:
         data = response.json()
         suggestions = data.get('data', {}).get('suggestions', [])